@@ -8,6 +8,8 @@ This file has classes for inventories
 import numpy as np
 import pygame
 
+from assets import convert_if_possible
+
 
 # Define the inventory class for objects with an inventory
 class ObjectInventory:
@@ -21,15 +23,43 @@ class ObjectInventory:
         self.slot_size = 55  # size of each slot in the inventory
         self.slot_spacing = 10  # spacing between each slot in the inventory
         self.slot_border_width = 5  # width of the border around each slot in the inventory (drawn around each slot)
-        self.bottom_right_corner = self.get_bottom_right_corner()  # numpy array, bottom right corner of the inventory
+        # half the screen size as plain floats, for get_screen_pos
+        self.half_screen = (float(screen_size[0]) / 2, float(screen_size[1]) / 2)
+        self.bottom_right_corner = self.get_bottom_right_corner()  # (x, y), bottom right corner of the inventory
+
+        # pre-drawn picture of the inventory (background, slots and items), None when it needs to be drawn again
+        # it only changes when the contents change, so an open inventory is rendered with one blit
+        self.panel = None
+        self.version = 0  # goes up every time the contents change, so other code can tell when to look at them again
+        # function called (with no arguments) after the contents change, the game world uses it to wake up the
+        # entity the inventory belongs to (e.g. so a crafting station checks its recipe)
+        self.on_change = None
+
+        # slot bookkeeping, so finding, removing and counting items doesn't have to loop over every slot
+        # these are kept up to date by set_slot, so the contents should only be changed through it
+        self.item_slots = {}  # item -> (x, y) slot the item is in
+        self.item_count = 0  # number of items in the inventory
+        # stack of slots that may be empty, the top is the next slot to fill
+        # slots are pushed when they are emptied, and slots that were filled since are skipped when popped
+        self.free_slots = []
+        self.free_slots_set = set()  # slots in the stack, so a slot is never in it twice
+        for i in reversed(range(self.contents.shape[0])):
+            for j in reversed(range(self.contents.shape[1])):
+                item = self.contents[i, j]
+                if item is None:
+                    self.free_slots.append((i, j))
+                    self.free_slots_set.add((i, j))
+                else:
+                    self.item_slots[item] = (i, j)
+                    self.item_count += 1
 
     # function to get the screen position of the inventory
+    # returns (x, y) as floats, worked out with scalar math so no numpy arrays are made on every call
     def get_screen_pos(self):
         # get the screen position of the inventory
         # this is the top left corner of the inventory that is drawn on the screen
-        camera_position = self.player.position - self.screen_size / 2
-        screen_position = self.map_position - camera_position
-        return screen_position
+        view_x, view_y = self.player.view_position.tolist()
+        return self.map_position[0] - view_x + self.half_screen[0], self.map_position[1] - view_y + self.half_screen[1]
 
     # function to get the bottom right corner of the inventory, based on the size of the inventory
     def get_bottom_right_corner(self):
@@ -40,8 +70,7 @@ class ObjectInventory:
         screen_position = self.get_screen_pos()
         x_corner = screen_position[0] + 2*self.border_width + self.contents.shape[0] * (self.slot_size + self.slot_spacing) - self.slot_spacing
         y_corner = screen_position[1] + 2*self.border_width + self.contents.shape[1] * (self.slot_size + self.slot_spacing) - self.slot_spacing
-        corner = np.array([x_corner, y_corner])
-        return corner
+        return x_corner, y_corner
 
     # function to output the coords of the corner of a given inventory slot
     def get_slot_coords(self, x, y):
@@ -51,6 +80,26 @@ class ObjectInventory:
         y_corner = screen_position[1] + self.border_width + y * (self.slot_size + self.slot_spacing)
         return x_corner, y_corner
 
+    # function to get the slot under a screen position, (None, None) if it isn't over a slot
+    # the slot is worked out from the offset to the first slot and the slot pitch, so it's the same cost for any inventory size
+    # padding makes each slot that many pixels bigger on every side
+    def slot_at(self, mouse_position, padding=0):
+        screen_position = self.get_screen_pos()
+        pitch = self.slot_size + self.slot_spacing  # distance from one slot to the next
+        # offset from the corner of the first slot, shifted by the padding so the padded area left of a slot counts as that slot
+        offset_x = mouse_position[0] - (screen_position[0] + self.border_width) + padding
+        offset_y = mouse_position[1] - (screen_position[1] + self.border_width) + padding
+        x = int(offset_x // pitch)
+        y = int(offset_y // pitch)
+        if not (0 <= x < self.contents.shape[0] and 0 <= y < self.contents.shape[1]):
+            return None, None
+        # check the position is inside the (padded) slot and not in the spacing between slots
+        inside_x = offset_x - x * pitch
+        inside_y = offset_y - y * pitch
+        if 0 < inside_x < self.slot_size + 2 * padding and 0 < inside_y < self.slot_size + 2 * padding:
+            return x, y
+        return None, None
+
     # function to check if the mouse is over the inventory
     def mouse_over(self, mouse_position):
         screen_position = self.get_screen_pos()
@@ -61,36 +110,62 @@ class ObjectInventory:
                 return True
         return False
 
+    # function to put an item in a slot, or empty the slot if item is None
+    # keeps the slot bookkeeping up to date, so all changes to the contents should go through here
+    def set_slot(self, x, y, item):
+        old_item = self.contents[x, y]
+        if old_item is not None:
+            del self.item_slots[old_item]
+            self.item_count -= 1
+        self.contents[x, y] = item
+        # the contents changed, so the panel has to be drawn again
+        self.panel = None
+        self.version += 1
+        if item is not None:
+            self.item_slots[item] = (x, y)
+            self.item_count += 1
+        elif old_item is not None and (x, y) not in self.free_slots_set:
+            # the slot is empty now, so it is the next one to fill
+            self.free_slots.append((x, y))
+            self.free_slots_set.add((x, y))
+        if self.on_change is not None:
+            self.on_change()
+
+    # function to get the slot an item is in, (None, None) if it isn't in this inventory
+    def get_item_slot(self, item):
+        return self.item_slots.get(item, (None, None))
+
     # function to calculate the number of items in the inventory
     def num_items(self):
-        # calculate the number of items in the inventory
-        num = 0
-        for i in range(self.contents.shape[0]):
-            for j in range(self.contents.shape[1]):
-                if self.contents[i, j] is not None:
-                    num += 1
-        return num
+        return self.item_count
 
     # function to find an empty slot in the inventory
     def find_empty_slot(self):
-        # find an empty slot in the inventory
-        for i in range(self.contents.shape[0]):
-            for j in range(self.contents.shape[1]):
-                if self.contents[i, j] is None:
-                    return i, j
+        # drop slots from the top of the stack that have been filled since they were pushed
+        free_slots = self.free_slots
+        while free_slots:
+            x, y = free_slots[-1]
+            if self.contents[x, y] is None:
+                return x, y
+            self.free_slots_set.discard(free_slots.pop())
         return None, None  # if there are no empty slots
 
+    # function to put an item in the next empty slot, returns the slot or (None, None) if the inventory is full
+    # this only updates the inventory, not the item's position variables
+    def add_item(self, item):
+        x, y = self.find_empty_slot()
+        if x is not None:
+            self.set_slot(x, y, item)
+        return x, y
+
     # item to hand function
     def item_to_hand(self, item, player, mouse_position):
         # this is called when moving an item from the inventory to the player's hand
         # it updates the item's variables and the player's variables
         # find the item position in the inventory, then set the item in the inventory to None
-        for i in range(self.contents.shape[0]):
-            for j in range(self.contents.shape[1]):
-                if self.contents[i, j] == item:
-                    self.contents[i, j] = None
-                    # print("Item removed: ", item)
-                    # print("Inventory contents: ", self.contents)
+        x, y = self.get_item_slot(item)
+        if x is not None:
+            self.set_slot(x, y, None)
         item.in_hand = True
         item.in_inventory = False
         player.item_in_hand = item
@@ -111,63 +186,55 @@ class ObjectInventory:
         player.item_in_hand = None
         # by default, drop the item to the map at the player's position
         item.in_inventory = False
-        item.map_position = player.position.copy()
+        item.map_position = player.position
 
         # check if the mouse is over a slot to place the item
-        # get the number of slots in the inventory
-        x_slots = len(self.contents)
-        y_slots = len(self.contents[0])
-        # loop through the slots
-        for x in range(x_slots):
-            for y in range(y_slots):
-                # get the x and y coordinates of the slot
-                x_corner, y_corner = self.get_slot_coords(x, y)
-                # check if the mouse is over the slot
-                padding = 1  # padding to make the slot easier to drop items into
-                if x_corner - padding < mouse_pos[0] < x_corner + self.slot_size + padding:
-                    if y_corner - padding < mouse_pos[1] < y_corner + self.slot_size + padding:
-                        # if the slot is empty, put the item in the slot
-                        if self.contents[x][y] is None:
-                            self.contents[x][y] = item
-                            item.in_inventory = True
-                            # update the item's screen and map position
-                            item.screen_position = np.array([x_corner, y_corner])
-                            item.map_position = item.get_map_pos(player.position)
-                            break
-                        # if the slot is not empty, try putting the item in an empty slot
-                        else:
-                            # find an empty slot
-                            empty_x, empty_y = self.find_empty_slot()
-                            # put the item in the empty slot (if inventory is full, item should already be dropped)
-                            if empty_x is not None:
-                                self.contents[empty_x][empty_y] = item
-                                item.in_inventory = True
-                                empty_x_corner, empty_y_corner = self.get_slot_coords(empty_x, empty_y)
-                                item.screen_position = np.array([empty_x_corner, empty_y_corner])
-                                # update the item's screen and map position
-                                item.map_position = item.get_map_pos(player.position)
-                                break
-                            else:
-                                print("Inventory full, no empty slot found to place item, dropping item to ground")
+        padding = 1  # padding to make the slot easier to drop items into
+        x, y = self.slot_at(mouse_pos, padding)
+        if x is None:
+            return
+        # if the slot is not empty, try putting the item in an empty slot
+        if self.contents[x, y] is not None:
+            x, y = self.find_empty_slot()
+            # if inventory is full, item should already be dropped
+            if x is None:
+                print("Inventory full, no empty slot found to place item, dropping item to ground")
+                return
+        self.set_slot(x, y, item)
+        item.in_inventory = True
+        # update the item's screen and map position
+        x_corner, y_corner = self.get_slot_coords(x, y)
+        item.screen_position = np.array([x_corner, y_corner])
+        item.map_position = item.get_map_pos(player.view_position)
 
     def render(self, surface):
-        # Draw the inventory and its slots on the given surface
+        # Draw the inventory on the given surface
+        # the inventory is drawn onto its panel when the contents change, then the panel is blitted every frame
+        if self.panel is None:
+            self.panel = self.draw_panel()
+        top_left = self.get_screen_pos()
+        surface.blit(self.panel, (top_left[0], top_left[1]))
+
+    # function to draw the inventory and its slots onto a new panel surface
+    def draw_panel(self):
         # default color scheme
         background_color = (255, 255, 255)
         border_color = (0, 150, 0)
         slot_border_color = (250, 180, 0)
         item_slot_color = (0, 100, 0)
 
+        # the panel is the size of the inventory, with its top left corner at (0, 0)
+        relative_width = 2*self.border_width + self.contents.shape[0] * (self.slot_size + self.slot_spacing) - self.slot_spacing
+        relative_height = 2*self.border_width + self.contents.shape[1] * (self.slot_size + self.slot_spacing) - self.slot_spacing
+        # match the display's pixel format, if there is one, for faster blits
+        panel = convert_if_possible(pygame.Surface((relative_width, relative_height)), alpha=False)
+
         # Draw the inventory
         # draw a rectangle for the background
         #   pygame.draw.rect takes in the following arguments: surface, color, (top_left x y, bottom_right x y, width)
-        top_left = self.get_screen_pos()
-        bottom_right = self.get_bottom_right_corner()
-        relative_width = bottom_right[0] - top_left[0]
-        relative_height = bottom_right[1] - top_left[1]
-        pygame.draw.rect(surface, background_color, (top_left[0], top_left[1], relative_width, relative_height))
+        pygame.draw.rect(panel, background_color, (0, 0, relative_width, relative_height))
         # draw a rectangle for the border
-        pygame.draw.rect(surface, border_color, (top_left[0], top_left[1], relative_width, relative_height), self.border_width)
+        pygame.draw.rect(panel, border_color, (0, 0, relative_width, relative_height), self.border_width)
 
         # Draw the slots
         # get the number of slots in the inventory
@@ -176,17 +243,19 @@ class ObjectInventory:
         # loop through the slots
         for x in range(x_slots):
             for y in range(y_slots):
-                # get the x and y coordinates of the slot
-                x_corner, y_corner = self.get_slot_coords(x, y)
+                # get the x and y coordinates of the slot on the panel
+                x_corner = self.border_width + x * (self.slot_size + self.slot_spacing)
+                y_corner = self.border_width + y * (self.slot_size + self.slot_spacing)
                 # draw a rectangle for the slot
-                pygame.draw.rect(surface, item_slot_color, (x_corner, y_corner, self.slot_size, self.slot_size))
+                pygame.draw.rect(panel, item_slot_color, (x_corner, y_corner, self.slot_size, self.slot_size))
                 # slot border
-                pygame.draw.rect(surface, slot_border_color, (x_corner, y_corner, self.slot_size, self.slot_size), self.slot_border_width)
+                pygame.draw.rect(panel, slot_border_color, (x_corner, y_corner, self.slot_size, self.slot_size), self.slot_border_width)
 
                 # draw the item in the slot
                 if self.contents[x][y] is not None:
                     # item method render_on_screen(self, window, position, being_held):
-                    self.contents[x][y].render_on_screen(surface, np.array([x_corner, y_corner]), False)
+                    self.contents[x][y].render_on_screen(panel, (x_corner, y_corner), False)
+        return panel
 
 
 ### NEW PLAYER INVENTORY CODE ###
@@ -194,12 +263,14 @@ class ObjectInventory:
 # the screen position of the inventory is now static (so no map_position)
 #   this means the top left corner of the inventory is always at (0, screen_size[1] - 150)
 #   and the bottom right corner will also be static, based on the size of the inventory
+#   the panel is only drawn again when the contents change, so it stays cached for the whole session
+#   while the inventory is opened and closed
 
 # Define the inventory class for the player
 # Uses the ObjectInventory class as a base
 class PlayerInventory(ObjectInventory):
     def __init__(self, screen_size, contents, player):
-        self.screen_position = np.array([0, screen_size[1] - 130]) # top left corner of the inventory on the screen
+        self.screen_position = (0, int(screen_size[1]) - 130) # top left corner of the inventory on the screen
         super().__init__(screen_size, contents, False, (0, 0), player)
 
     # override the get_screen_pos method
@@ -4,60 +4,153 @@ Items.py
 Everything related to items
 '''
 
+import gc
 import pygame
-import os
 import random
+from collections import namedtuple
 import numpy as np
 
+from sprite_cache import get_scaled
+from assets import assets
+from atlas import atlas
+
+
+# Define the item type record
+# everything that is the same for every item of a kind (strings, image, value), stored once and shared.
+# it is a namedtuple so it can't be changed after it is made, items of the same kind all point to the same one
+# type_id is the index of the type in the registry, so an item's kind can be saved as a single number
+# image_path is the file the image was loaded from (relative to the game folder)
+# values is the table of values that the rarity can have
+# map_sprite and slot_sprite are (atlas page, rectangle) for drawing on the map and in slots, None if not in the atlas
+ItemType = namedtuple("ItemType", ["type_id", "name", "description", "item_rarity", "item_type", "type_name", "value",
+                                   "image_path", "image", "values", "map_sprite", "slot_sprite"])
+
+
+# Define the item type registry class
+# hands out the shared ItemType for a kind of item, making it the first time that kind is asked for
+class ItemTypeRegistry:
+    def __init__(self, image_size=(100, 100), slot_size=(50, 50)):
+        self.image_size = image_size  # size item images are scaled to on the map
+        self.slot_size = slot_size  # size item images are scaled to in inventory slots and the player's hand
+        self.types = []  # type_id -> ItemType
+        self.type_ids = {}  # (name, description, rarity, type, type name, value, image path) -> type_id
+
+    def __len__(self):
+        return len(self.types)
+
+    def __getitem__(self, type_id):
+        return self.types[type_id]
+
+    # function to get the item type for a kind of item, making it if it doesn't exist yet
+    def get(self, name, description, item_rarity, item_type, type_name, value, image_path):
+        key = (name, description, item_rarity, item_type, type_name, value, image_path)
+        type_id = self.type_ids.get(key)
+        if type_id is not None:
+            return self.types[type_id]
+        type_id = len(self.types)
+        image = assets.load_scaled(image_path, self.image_size)  # shared by every item of this type
+        values = tuple(item_values.get(item_rarity, (value,)))
+        map_sprite = atlas.sprite(image_path, self.image_size)
+        slot_sprite = atlas.sprite(image_path, self.slot_size)
+        item_kind = ItemType(type_id, name, description, item_rarity, item_type, type_name, value, image_path, image, values,
+                             map_sprite, slot_sprite)
+        self.types.append(item_kind)
+        self.type_ids[key] = type_id
+        return item_kind
+
 
 # Define the item class
+# only the state that is different for each item is stored on the item, everything else is in its ItemType.
+# __slots__ means there is no __dict__ for each item, so an item is under 100 bytes (not counting its positions)
 class Item:
-    def __init__(self, name, image, description, item_rarity, item_type, type_name, value, in_inventory, map_position, screen_position, in_hand, player):
-        self.name = name
-        self.image = image  # square image
-        self.width = self.image.get_width()
-        self.height = self.image.get_height()
-        self.image_scale = 50  # pixels, what the image should be scaled to when in the inventory or being held
-        self.description = description
-        self.item_rarity = item_rarity
-        self.item_type = item_type
-        self.type_name = type_name
-        self.value = value
+    __slots__ = ("kind", "in_inventory", "map_x", "map_y", "screen_position", "in_hand")
+
+    image_scale = 50  # pixels, what the image should be scaled to when in the inventory or being held
+
+    def __init__(self, kind, in_inventory, map_position, screen_position, in_hand):
+        self.kind = kind  # ItemType, the shared data for this kind of item
         self.in_inventory = in_inventory  # True if the item is in an inventory, False if it is on the map
-        self.map_position = map_position  # for when the item is on the map and not in the inventory
+        # for when the item is on the map and not in the inventory, kept as two floats (map_x and map_y)
+        # instead of a numpy array, which would take more memory than the rest of the item
+        # (set directly rather than through the map_position setter, it is quicker when making lots of items)
+        self.map_x = float(map_position[0])
+        self.map_y = float(map_position[1])
         self.screen_position = screen_position # for when the item is in the inventory or being moved (in the player's hand)
         self.in_hand = in_hand  # True if the item is being moved (in the player's hand), False if it is in the inventory or on the map
-        self.player = player  # the player, to get their position
+
+    # the map position as (x, y), it can be set from any pair of numbers (e.g. a numpy array)
+    @property
+    def map_position(self):
+        return self.map_x, self.map_y
+
+    @map_position.setter
+    def map_position(self, position):
+        self.map_x = float(position[0])
+        self.map_y = float(position[1])
+
+    # the shared data is read through the item type
+    @property
+    def name(self):
+        return self.kind.name
+
+    @property
+    def image(self):
+        return self.kind.image  # square image
+
+    @property
+    def width(self):
+        return self.kind.image.get_width()
+
+    @property
+    def height(self):
+        return self.kind.image.get_height()
+
+    @property
+    def description(self):
+        return self.kind.description
+
+    @property
+    def item_rarity(self):
+        return self.kind.item_rarity
+
+    @property
+    def item_type(self):
+        return self.kind.item_type
+
+    @property
+    def type_name(self):
+        return self.kind.type_name
+
+    @property
+    def value(self):
+        return self.kind.value
 
     # function to get the screen position of the item from the map position and player position
+    # returns (x, y), worked out with scalar math so no numpy arrays are made on every call
     def get_screen_pos(self, player_position):
         # get the screen position of the item, assuming the map position is accurate
         # this is the top left corner of the item that is drawn on the screen
         # get the screen size
-        screen_size = np.array(pygame.display.get_surface().get_size())
-        cam_pos = player_position - screen_size / 2
-        screen_position = self.map_position - cam_pos
-        # print("screen_size: ", screen_size)
-        # print("cam_pos: ", cam_pos)
-        # print("screen_position: ", screen_position)
-        return screen_position
+        screen_width, screen_height = pygame.display.get_surface().get_size()
+        # camera position is player_position - screen_size / 2
+        return (self.map_x - player_position[0] + screen_width / 2,
+                self.map_y - player_position[1] + screen_height / 2)
 
     # function to get the map position of the item from the screen position and player position
     def get_map_pos(self, player_position):
         # get the map position of the item, assuming the screen position is accurate
         # this is the top left corner of the item that is drawn on the map
         # get the screen size
-        screen_size = np.array(pygame.display.get_surface().get_size())
-        cam_pos = player_position - screen_size / 2
-        map_position = self.screen_position + cam_pos
-        return map_position
+        screen_width, screen_height = pygame.display.get_surface().get_size()
+        return np.array([self.screen_position[0] + player_position[0] - screen_width / 2,
+                         self.screen_position[1] + player_position[1] - screen_height / 2])
 
     # bounding box for when the item is on the map
     def bounding_box(self, camera_position):
         # bounding_box = pygame.Rect(x, y, w, h)
         # map_pos is not the correct position, need to subtract camera position
-        x = self.map_position[0] - camera_position[0]
-        y = self.map_position[1] - camera_position[1]
+        x = self.map_x - camera_position[0]
+        y = self.map_y - camera_position[1]
         return pygame.Rect(x, y, self.image.get_width(), self.image.get_height())
 
     # bounding box for when the item is in the inventory
@@ -78,21 +171,31 @@ class Item:
     # To render on the map, when not in the inventory or being held
     def render_on_map(self, window, camera_position):
         # Update position based on player position
-        barr_x = self.map_position[0] - camera_position[0]
-        barr_y = self.map_position[1] - camera_position[1]
-        window.blit(self.image, (barr_x, barr_y))
+        barr_x = self.map_x - camera_position[0]
+        barr_y = self.map_y - camera_position[1]
+        sprite = self.kind.map_sprite
+        if sprite is not None:
+            # the item's part of the atlas page
+            window.blit(sprite[0], (barr_x, barr_y), sprite[1])
+        else:
+            window.blit(self.kind.image, (barr_x, barr_y))
 
     # To render on the screen, when in the inventory or being held
     def render_on_screen(self, window, position, being_held):
         # position is the top left corner of the item slot in the inventory,
-        # make the image smaller
-        smaller_image = pygame.transform.scale(self.image, (self.image_scale, self.image_scale))
+        # the smaller image is the item's part of the atlas page, or if it isn't in the atlas
+        # a scaled image shared through the sprite cache (so this only scales once)
+        sprite = self.kind.slot_sprite
+        if sprite is not None:
+            smaller_image, area = sprite
+        else:
+            smaller_image, area = get_scaled(self.kind.image, (self.image_scale, self.image_scale)), None
         # Update position based on position plus offset if being held
         if being_held:
             self.screen_position = position - np.array([self.image_scale/2, self.image_scale/2])
-            window.blit(smaller_image, (self.screen_position[0], self.screen_position[1]))
+            window.blit(smaller_image, (self.screen_position[0], self.screen_position[1]), area)
         else:
-            window.blit(smaller_image, (position[0], position[1]))
+            window.blit(smaller_image, (position[0], position[1]), area)
 
 # Item rarities
 rarity = ["Common", "Uncommon", "Rare", "Epic", "Legendary", "Mythic"]
@@ -138,32 +241,32 @@ miscellaneous_names = ["Statue", "Key", "Coin", "Gem", "Book", "Scroll", "Map",
 
 # function to get an image given the item type
 # each folder in the \images\items folder is a type (ex. armor, weapons, etc.)
-def get_item_image(item_type, type_name):
+def get_item_image(item_type, type_name, size=None):
     # item_type is a string, equal to the item type (ex. "armor", "weapon", etc.)
     # type_name is a string, equal to the item type name (ex. "sword", "helmet", etc.)
+    # size is (width, height) to get a scaled image, None for the original size
 
-    # set the names to lowercase
-    item_type = item_type.lower()
-    type_name = type_name.lower()
+    # the asset manager indexes the folders and decodes each image only once,
+    # the returned image is shared with other items so it should not be drawn on
+    return assets.get_item_image(item_type, type_name, size)
 
-    # get the path to the folder
-    path = os.path.join('images', 'items', item_type, type_name)
-    # get a list of all the files in the folder
-    files = os.listdir(path)
-    # get a random file from the list
-    file = random.choice(files)
-    # get the path to the file
-    path = os.path.join('images', 'items', item_type, type_name, file)
-    # load the image and return it
-    return pygame.image.load(path)
+
+# function to get a random image file for an item type and type name
+def get_item_image_path(item_type, type_name):
+    return random.choice(assets.get_item_files(item_type, type_name))
+
+
+# the item types used by the game
+item_types = ItemTypeRegistry()
 
 
 # Define a function to create a random item
-def create_rand_item(in_inventory, map_position, player):
+def create_rand_item(in_inventory, map_position, player=None):
     # in_inventory is a boolean, True if the item is in the player's inventory, False if it is on the map
     # map_position is a tuple, the position of the item on the map (x, y) used when not in the inventory
+    # player is not used anymore (items don't keep a reference to the player), it is kept so older calls still work
     # parameters for the item class:
-    # name, image, description, item_rarity, item_type, type_name, value, in_inventory, map_position, screen_position, in_hand
+    # kind, in_inventory, map_position, screen_position, in_hand
 
     # get a random rarity
     item_rarity = random.choice(rarity)
@@ -180,21 +283,16 @@ def create_rand_item(in_inventory, map_position, player):
     # set item description based on rarity, type, and type name
     description = "This is a " + str(item_rarity) + " " + str(item_type) + " " + str(type_name) + "."
 
-    # load the image
-    item_image = get_item_image(item_type, type_name)
-    # Set the desired size for the image
-    new_width, new_height = 100, 100
-    new_size = (new_width, new_height)
-    # Resize the image
-    resized_image = pygame.transform.scale(item_image, new_size)
+    # pick the image, the item type loads it already resized (shared by all items using the same image)
+    image_path = get_item_image_path(item_type, type_name)
 
     # set the value of the item
     value = random.choice(item_values.get(item_rarity))
 
-    # Create the item
-    # params: name, image, description, item_rarity, item_type, type_name, value, in_inventory, map_position, screen_position, in_hand, player
-    item = Item(name, resized_image, description, item_rarity, item_type, type_name, value, in_inventory, map_position,
-                (0, 0), False, player)
+    # get the shared item type and create the item
+    # params: kind, in_inventory, map_position, screen_position, in_hand
+    kind = item_types.get(name, description, item_rarity, item_type, type_name, value, image_path)
+    item = Item(kind, in_inventory, map_position, (0, 0), False)
     # Return the item
     return item
 
@@ -208,22 +306,84 @@ def create_item(in_inventory=False, map_position=(0, 0), name="", description=""
     if description == "":
         description = "A statue item"
 
-    # load the image
-    item_image = get_item_image(item_type, type_name)
-    # Set the desired size for the image
-    new_width, new_height = 100, 100
-    new_size = (new_width, new_height)
-    # Resize the image
-    resized_image = pygame.transform.scale(item_image, new_size)
+    # pick the image, the item type loads it already resized (shared by all items using the same image)
+    image_path = get_item_image_path(item_type, type_name)
 
-    # Create the item
+    # get the shared item type and create the item
     # need the following parameters:
-    # name, image, description, item_rarity, item_type, type_name, value, in_inventory, map_position, screen_position, in_hand
-    item = Item(name, resized_image, description, rarity, item_type, type_name, value, in_inventory, map_position, (0, 0), False)
+    # kind, in_inventory, map_position, screen_position, in_hand
+    kind = item_types.get(name, description, rarity, item_type, type_name, value, image_path)
+    item = Item(kind, in_inventory, map_position, (0, 0), False)
     # Return the item
     return item
 
 
+# function to spawn many random items at once, e.g. to fill a world with loot
+# count is the number of items, region is (x, y, width, height) on the map that they are spread over
+# rarities, types, names, values and images are all picked in one vectorized pass with numpy,
+# and items with the same rarity, type, name, value and image share the same ItemType
+# if world is given the items are added to it (world.add_items), the list of new items is returned
+def spawn_items(count, region, world=None, rng=None):
+    if rng is None:
+        rng = np.random.default_rng()
+    region_x, region_y, region_width, region_height = region
+
+    # tables of the choices, in the same order as the lists above
+    type_pairs = [(item_type, type_name) for item_type in types for type_name in item_type_names[item_type]]
+    names_per_type = np.array([len(item_type_names[item_type]) for item_type in types])
+    first_pair_of_type = np.concatenate(([0], np.cumsum(names_per_type)[:-1]))
+    values_per_rarity = np.array([len(item_values[item_rarity]) for item_rarity in rarity])
+    files_per_pair = np.array([len(assets.get_item_files(item_type, type_name)) for item_type, type_name in type_pairs])
+
+    # make the random choices for every item at once
+    # (the type is picked first and then a name for that type, like create_rand_item)
+    rarity_index = rng.integers(len(rarity), size=count)
+    type_index = rng.integers(len(types), size=count)
+    pair_index = first_pair_of_type[type_index] + (rng.random(count) * names_per_type[type_index]).astype(np.int64)
+    value_index = (rng.random(count) * values_per_rarity[rarity_index]).astype(np.int64)
+    file_index = (rng.random(count) * files_per_pair[pair_index]).astype(np.int64)
+    positions = np.empty((count, 2))
+    positions[:, 0] = region_x + rng.random(count) * region_width
+    positions[:, 1] = region_y + rng.random(count) * region_height
+
+    # combine the choices into one number, so each different kind of item is only set up once
+    max_values = int(values_per_rarity.max())
+    max_files = int(files_per_pair.max())
+    kind = ((rarity_index * len(type_pairs) + pair_index) * max_values + value_index) * max_files + file_index
+    unique_kinds, kind_index = np.unique(kind, return_inverse=True)
+    kinds = []
+    for unique_kind in unique_kinds.tolist():
+        unique_kind, file_number = divmod(unique_kind, max_files)
+        unique_kind, value_number = divmod(unique_kind, max_values)
+        rarity_number, pair_number = divmod(unique_kind, len(type_pairs))
+        item_rarity = rarity[rarity_number]
+        item_type, type_name = type_pairs[pair_number]
+        kinds.append(item_types.get(
+            item_rarity + " " + item_type + " " + type_name,
+            "This is a " + item_rarity + " " + item_type + " " + type_name + ".",
+            item_rarity,
+            item_type,
+            type_name,
+            item_values[item_rarity][value_number],
+            assets.get_item_files(item_type, type_name)[file_number],
+        ))
+
+    # make the items, the positions are turned into python floats all at once
+    # the garbage collector is paused while they are made and added to the world, otherwise it keeps
+    # stopping to look through all the new items (none of them can be garbage yet)
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        items = [Item(kinds[index], False, position, (0, 0), False)
+                 for index, position in zip(kind_index.tolist(), positions.tolist())]
+        if world is not None:
+            world.add_items(items, positions)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return items
+
+
 if __name__ == "__main__":
     # Define the item dict
     items = {}
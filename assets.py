@@ -0,0 +1,219 @@
+'''
+10/18/2026
+assets.py
+Asset manager, loads every image once and hands out shared surfaces
+'''
+
+import os
+import struct
+import random
+from concurrent.futures import ThreadPoolExecutor, wait
+import pygame
+
+from sprite_cache import scaled_cache
+
+
+# color of the placeholder surfaces handed out while images are decoded in the background
+PLACEHOLDER_COLOR = (128, 128, 128, 96)
+
+
+# function to read the size of a PNG image from its header without decoding it, None if it isn't a PNG
+def png_size(path):
+    with open(path, "rb") as file:
+        header = file.read(24)
+    if len(header) < 24 or header[:8] != b"\x89PNG\r\n\x1a\n" or header[12:16] != b"IHDR":
+        return None
+    return struct.unpack(">II", header[16:24])
+
+
+# function to copy an image's pixels (including alpha) into a surface of the same size, without blending
+def fill_placeholder(placeholder, image):
+    placeholder.fill((0, 0, 0, 0))
+    # adding onto a fully clear surface copies the pixels exactly
+    placeholder.blit(image, (0, 0), special_flags=pygame.BLEND_RGBA_ADD)
+
+
+# function to convert a surface to the display's pixel format for faster blits, alpha keeps per pixel transparency
+# converting needs a display, without one (e.g. building the atlas headless) the surface is returned as it is
+def convert_if_possible(surface, alpha=True):
+    if pygame.display.get_init() and pygame.display.get_surface() is not None:
+        return surface.convert_alpha() if alpha else surface.convert()
+    return surface
+
+
+# folder that the game files are in, image paths are relative to this
+GAME_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+# Define the asset manager class
+# item images are indexed from images/items/<type>/<name>/ the first time they are needed,
+# each file is decoded once, and scaled copies are made once per size and shared by every item using them
+# after start_async, images are decoded and scaled on a thread pool. load and load_scaled then return a
+# placeholder surface of the right size straight away, and poll() draws the real image onto the placeholder
+# when it is ready, so everything holding the surface shows the real image without being told
+class AssetManager:
+    def __init__(self, game_dir=GAME_DIR):
+        self.game_dir = game_dir
+        self.item_files = None  # (item type, type name) -> list of image paths, lowercase names, None until indexed
+        self.images = {}  # path -> decoded surface
+        self.image_paths = {}  # decoded surface -> path, so things holding an image can be saved as the path
+        self.scaled_images = {}  # (path, width, height) -> scaled surface
+        self.files_listed = 0  # number of folders listed, for checking that no I/O happens after warm up
+        self.files_loaded = 0  # number of images decoded from disk
+        self.executor = None  # ThreadPoolExecutor decoding images in the background, None to decode when asked
+        self.decodes = {}  # path -> Future of the decoded surface, until poll() has swapped it in
+        self.jobs = []  # (Future of a surface, placeholder it goes into) not swapped in yet
+        self.requested = 0  # number of placeholders handed out
+        self.completed = 0  # number of placeholders filled in with their image
+
+    # function to index the item image folders, images/items/<type>/<name>/<files>
+    def index_items(self):
+        self.item_files = {}
+        items_dir = os.path.join('images', 'items')
+        for item_type in sorted(os.listdir(os.path.join(self.game_dir, items_dir))):
+            type_dir = os.path.join(items_dir, item_type)
+            if not os.path.isdir(os.path.join(self.game_dir, type_dir)):
+                continue
+            self.files_listed += 1
+            for type_name in sorted(os.listdir(os.path.join(self.game_dir, type_dir))):
+                name_dir = os.path.join(type_dir, type_name)
+                if not os.path.isdir(os.path.join(self.game_dir, name_dir)):
+                    continue
+                self.files_listed += 1
+                files = sorted(os.listdir(os.path.join(self.game_dir, name_dir)))
+                self.item_files[(item_type, type_name)] = [os.path.join(name_dir, file) for file in files]
+
+    # function to get the list of image paths for an item type and type name
+    def get_item_files(self, item_type, type_name):
+        if self.item_files is None:
+            self.index_items()
+        return self.item_files[(item_type.lower(), type_name.lower())]
+
+    # function to start decoding images in the background, workers is the number of threads (None for the default)
+    def start_async(self, workers=None):
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="assets")
+
+    # function to make a placeholder surface, size is (width, height)
+    def make_placeholder(self, size):
+        placeholder = convert_if_possible(pygame.Surface(size, pygame.SRCALPHA))
+        placeholder.fill(PLACEHOLDER_COLOR)
+        self.requested += 1
+        return placeholder
+
+    # function run on the thread pool to decode an image
+    def decode(self, path):
+        return pygame.image.load(os.path.join(self.game_dir, path))
+
+    # function run on the thread pool to scale an image once it is decoded
+    # decodes are always queued before the scales that use them, so the decode is running or done by now
+    def scale_decoded(self, decode, size):
+        return pygame.transform.scale(decode.result(), size)
+
+    # function to get the Future decoding an image in the background, starting the decode if needed
+    def decode_async(self, path):
+        decode = self.decodes.get(path)
+        if decode is None:
+            decode = self.executor.submit(self.decode, path)
+            self.decodes[path] = decode
+        return decode
+
+    # function to load an image (path relative to the game folder), decoding it only the first time
+    def load(self, path):
+        image = self.images.get(path)
+        if image is None and self.executor is not None:
+            # the size of a PNG is in its header, so a placeholder of the same size can be handed out now
+            size = png_size(os.path.join(self.game_dir, path))
+            if size is not None:
+                image = self.make_placeholder(size)
+                self.images[path] = image
+                self.image_paths[image] = path
+                self.jobs.append((self.decode_async(path), image))
+        if image is None:
+            image = pygame.image.load(os.path.join(self.game_dir, path))
+            image = convert_if_possible(image)
+            self.files_loaded += 1
+            self.images[path] = image
+            self.image_paths[image] = path
+        return image
+
+    # function to get the path an image was loaded from, None if it wasn't loaded by the asset manager
+    def path_of(self, image):
+        return self.image_paths.get(image)
+
+    # function to get a shared scaled copy of an image, size is (width, height)
+    # these surfaces are shared, so they should not be drawn on
+    def load_scaled(self, path, size):
+        key = (path, int(size[0]), int(size[1]))
+        image = self.scaled_images.get(key)
+        if image is None and self.executor is not None and (path not in self.images or path in self.decodes):
+            # not decoded yet, decode and scale it in the background
+            image = self.make_placeholder((key[1], key[2]))
+            self.scaled_images[key] = image
+            self.jobs.append((self.executor.submit(self.scale_decoded, self.decode_async(path), (key[1], key[2])), image))
+        if image is None:
+            image = pygame.transform.scale(self.load(path), (key[1], key[2]))
+            self.scaled_images[key] = image
+        return image
+
+    # function to swap in the images that have finished decoding, call once per frame
+    # returns the placeholders that now have their real image, so anything drawn from them can be drawn again
+    def poll(self):
+        if not self.jobs and not self.decodes:
+            return []
+        swapped = []
+        waiting = []
+        for job, placeholder in self.jobs:
+            if job.done():
+                fill_placeholder(placeholder, job.result())
+                # scaled copies of the placeholder are out of date
+                scaled_cache.invalidate(placeholder)
+                swapped.append(placeholder)
+            else:
+                waiting.append((job, placeholder))
+        self.jobs = waiting
+        self.completed += len(swapped)
+        for path, decode in list(self.decodes.items()):
+            if decode.done():
+                del self.decodes[path]
+                self.files_loaded += 1
+                if path not in self.images:
+                    # only scaled copies were asked for, keep the decoded image for later loads
+                    image = convert_if_possible(decode.result())
+                    self.images[path] = image
+                    self.image_paths[image] = path
+        return swapped
+
+    # function to get how many placeholders have been filled in and how many were handed out, e.g. for a loading bar
+    def progress(self):
+        return self.completed, self.requested
+
+    # True while some images are still being decoded
+    def loading(self):
+        return bool(self.jobs or self.decodes)
+
+    # function to block until every image asked for so far is decoded and swapped in, returns the placeholders swapped
+    def wait(self, timeout=None):
+        wait([job for job, _ in self.jobs] + list(self.decodes.values()), timeout)
+        return self.poll()
+
+    # function to get a random image for an item type and type name
+    # if size is given the image is a shared scaled copy
+    def get_item_image(self, item_type, type_name, size=None):
+        path = random.choice(self.get_item_files(item_type, type_name))
+        if size is None:
+            return self.load(path)
+        return self.load_scaled(path, size)
+
+    # function to load every item image ahead of time, so making items later does no file I/O
+    # size is the size that items are scaled to, so the scaled copies are made too
+    def preload_items(self, size=(100, 100)):
+        if self.item_files is None:
+            self.index_items()
+        for paths in self.item_files.values():
+            for path in paths:
+                self.load_scaled(path, size)
+
+
+# the asset manager used by the game
+assets = AssetManager()
@@ -0,0 +1,202 @@
+'''
+10/18/2026
+atlas.py
+Texture atlas, packs every item and object sprite at the sizes it is drawn at into a few large surfaces
+Items and entities then blit their part (a rectangle) of an atlas page instead of a surface of their own.
+
+build step (writes images/atlas/, run again after changing images, the game also rebuilds it if it is out of date):
+    python atlas.py
+'''
+
+import os
+import json
+import pygame
+
+from assets import assets, convert_if_possible, GAME_DIR
+
+
+# version of the atlas index file layout, increase this when the layout changes
+ATLAS_VERSION = 1
+# folder the built atlas is written to, relative to the game folder
+ATLAS_DIR = os.path.join('images', 'atlas')
+# sizes item sprites are drawn at, on the map and in inventory slots / the player's hand (Item.image_scale)
+ITEM_SIZES = [(100, 100), (50, 50)]
+# width entity sprites are drawn at, the height keeps the image's aspect ratio (EntityWithInventory.width)
+OBJECT_WIDTH = 100
+
+
+# function to get the size an entity image is drawn at, the same as EntityWithInventory's width and height
+def object_size(image):
+    return OBJECT_WIDTH, int(image.get_height() * OBJECT_WIDTH / image.get_width())
+
+
+# function to list the image files under a folder (relative to the game folder), sorted so builds are the same every time
+def list_images(folder, game_dir=GAME_DIR):
+    paths = []
+    for root, dirs, files in os.walk(os.path.join(game_dir, folder)):
+        dirs.sort()
+        for file in sorted(files):
+            if file.lower().endswith(".png"):
+                paths.append(os.path.relpath(os.path.join(root, file), game_dir))
+    return paths
+
+
+# function to get the (path, width, height) of every sprite that goes in the atlas, and the source images
+# the sources are decoded here rather than through the asset manager, so building never gets a placeholder
+def atlas_sprites(game_dir=GAME_DIR):
+    sprites = []
+    sources = {}
+    for path in list_images(os.path.join('images', 'items'), game_dir):
+        sources[path] = pygame.image.load(os.path.join(game_dir, path))
+        for width, height in ITEM_SIZES:
+            sprites.append((path, width, height))
+    for path in list_images(os.path.join('images', 'objects'), game_dir):
+        sources[path] = pygame.image.load(os.path.join(game_dir, path))
+        sprites.append((path,) + object_size(sources[path]))
+    return sprites, sources
+
+
+# function to get the modification time and size of each source image, to check if a built atlas is out of date
+def source_stamps(game_dir=GAME_DIR):
+    stamps = {}
+    for path in list_images(os.path.join('images', 'items'), game_dir) + list_images(os.path.join('images', 'objects'), game_dir):
+        stat = os.stat(os.path.join(game_dir, path))
+        stamps[path] = [stat.st_size, int(stat.st_mtime)]
+    return stamps
+
+
+# Define the sprite atlas class
+# sprites are packed into pages (surfaces of page_size) in rows ("shelves"), tallest first.
+# sprite() gives (page surface, rectangle on the page), which is blitted with surface.blit(page, position, rectangle).
+# so the memory used for sprites is the pages, no matter how many items there are
+class SpriteAtlas:
+    def __init__(self, page_size=(512, 512), padding=1):
+        self.page_size = page_size  # pixels, most width and height of each page
+        self.padding = padding  # pixels between sprites
+        self.pages = []  # page surfaces
+        self.page_paths = []  # file each page was loaded from, None for pages built in memory
+        self.regions = {}  # (path, width, height) -> (page number, pygame.Rect)
+
+    def __len__(self):
+        return len(self.regions)
+
+    # function to get a sprite as (page surface, rectangle), None if it isn't in the atlas
+    def sprite(self, path, size):
+        if path is None:
+            return None
+        region = self.regions.get((path, int(size[0]), int(size[1])))
+        if region is None:
+            return None
+        return self.pages[region[0]], region[1]
+
+    # function to draw a sprite onto a surface, returns False if it isn't in the atlas
+    def blit(self, surface, path, size, position):
+        sprite = self.sprite(path, size)
+        if sprite is None:
+            return False
+        surface.blit(sprite[0], position, sprite[1])
+        return True
+
+    # function to work out where each sprite goes, sizes is a list of (key, width, height)
+    # returns key -> (page number, pygame.Rect)
+    def pack(self, sizes):
+        page_width, page_height = self.page_size
+        regions = {}
+        page = 0
+        x = y = shelf_height = 0
+        for key, width, height in sorted(sizes, key=lambda size: (-size[2], -size[1])):
+            if width > page_width or height > page_height:
+                raise ValueError("sprite is bigger than an atlas page: " + str(key))
+            if x + width > page_width:
+                # start a new shelf under the last one
+                x = 0
+                y += shelf_height + self.padding
+                shelf_height = 0
+            if y + height > page_height:
+                # start a new page
+                page += 1
+                x = y = shelf_height = 0
+            regions[key] = (page, pygame.Rect(x, y, width, height))
+            x += width + self.padding
+            shelf_height = max(shelf_height, height)
+        return regions
+
+    # function to pack and draw the sprites, sprites is a list of (path, width, height) and sources is path -> image
+    def build(self, sprites, sources):
+        self.regions = self.pack([((path, width, height), width, height) for path, width, height in sprites])
+        page_count = max((page for page, _ in self.regions.values()), default=-1) + 1
+        self.pages = []
+        for number in range(page_count):
+            # pages are cut down to the area used, so a part full page doesn't take a whole page of memory
+            used = [rect for page, rect in self.regions.values() if page == number]
+            size = (max(rect.right for rect in used), max(rect.bottom for rect in used))
+            page = convert_if_possible(pygame.Surface(size, pygame.SRCALPHA))
+            page.fill((0, 0, 0, 0))
+            self.pages.append(page)
+        self.page_paths = [None] * page_count
+        for (path, width, height), (page, rect) in self.regions.items():
+            # scaled the same way as the asset manager, so sprites look the same as before
+            image = pygame.transform.scale(sources[path], (width, height))
+            # adding onto the clear page copies the pixels exactly
+            self.pages[page].blit(image, rect, special_flags=pygame.BLEND_RGBA_ADD)
+
+    # function to write the pages as PNG files and an index of where each sprite is to a folder
+    def save(self, directory, stamps=None):
+        full_directory = os.path.join(GAME_DIR, directory)
+        os.makedirs(full_directory, exist_ok=True)
+        self.page_paths = []
+        for number, page in enumerate(self.pages):
+            path = os.path.join(directory, "atlas_{}.png".format(number))
+            pygame.image.save(page, os.path.join(GAME_DIR, path))
+            self.page_paths.append(path)
+        index = {
+            "version": ATLAS_VERSION,
+            "page_size": list(self.page_size),
+            "pages": [os.path.basename(path) for path in self.page_paths],
+            "sprites": [[key[0], key[1], key[2], page, rect.x, rect.y] for key, (page, rect) in self.regions.items()],
+            "sources": stamps if stamps is not None else {},
+        }
+        with open(os.path.join(full_directory, "atlas.json"), "w") as file:
+            json.dump(index, file, indent=1)
+
+    # function to read an atlas written by save, the pages are loaded through the asset manager
+    # (so with assets.start_async they are decoded in the background behind placeholders)
+    # returns False if there is no atlas, it is out of date, or it was written by a different version
+    def load(self, directory, stamps=None):
+        index_path = os.path.join(GAME_DIR, directory, "atlas.json")
+        if not os.path.exists(index_path):
+            return False
+        with open(index_path) as file:
+            index = json.load(file)
+        if index["version"] != ATLAS_VERSION or (stamps is not None and index["sources"] != stamps):
+            return False
+        self.page_size = tuple(index["page_size"])
+        self.page_paths = [os.path.join(directory, name) for name in index["pages"]]
+        self.pages = [assets.load(path) for path in self.page_paths]
+        self.regions = {}
+        for path, width, height, page, x, y in index["sprites"]:
+            # paths are stored with the separator of the system that built the atlas
+            path = os.path.normpath(path)
+            self.regions[(path, width, height)] = (page, pygame.Rect(x, y, width, height))
+        return True
+
+    # function to load the built atlas, building it (and saving it for next time) if it is missing or out of date
+    def load_or_build(self, directory=ATLAS_DIR):
+        stamps = source_stamps()
+        if self.load(directory, stamps):
+            return
+        self.build(*atlas_sprites())
+        self.save(directory, stamps)
+
+
+# the atlas used by the game, empty until load_or_build is called (sprites that aren't in it are drawn on their own)
+atlas = SpriteAtlas()
+
+
+if __name__ == "__main__":
+    # the pages are built without a display, so SDL's dummy video driver is enough
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    pygame.init()
+    atlas.build(*atlas_sprites())
+    atlas.save(ATLAS_DIR, source_stamps())
+    print("Packed {} sprites into {} page(s) in {}".format(len(atlas), len(atlas.pages), ATLAS_DIR))
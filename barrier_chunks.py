@@ -0,0 +1,118 @@
+'''
+10/18/2026
+barrier_chunks.py
+Pre-baked chunk surfaces for the static barrier layer
+'''
+
+import math
+from collections import OrderedDict
+import numpy as np
+import pygame
+
+from assets import convert_if_possible
+from spatial_hash import cell_groups
+
+
+# Define the barrier chunks class
+# the map is split into square chunks, and the barriers in each chunk are drawn once onto a chunk surface.
+# rendering the barrier layer is then just a blit for each chunk under the camera
+# barriers are stored in a BarrierField, chunks keep the indices of the barriers that overlap them
+class BarrierChunks:
+    def __init__(self, field, chunk_size=512, max_surfaces=64):
+        self.field = field  # BarrierField holding the barriers
+        self.chunk_size = chunk_size  # pixels, width and height of each chunk
+        self.max_surfaces = max_surfaces  # max number of baked chunk surfaces to keep, least recently drawn are dropped
+        self.chunk_barriers = {}  # (chunk_x, chunk_y) -> list of barrier indices overlapping the chunk, in the order they were added
+        self.surfaces = OrderedDict()  # (chunk_x, chunk_y) -> baked surface, in least recently drawn order
+        self.bakes = 0  # number of times a chunk surface was baked from scratch
+
+    # function to get the range of chunks that a rectangle (map coords) overlaps
+    def chunk_range(self, x, y, width, height):
+        x0 = math.floor(x / self.chunk_size)
+        y0 = math.floor(y / self.chunk_size)
+        x1 = math.floor((x + width) / self.chunk_size)
+        y1 = math.floor((y + height) / self.chunk_size)
+        return x0, y0, x1, y1
+
+    # function to get the top left corner of a chunk (map coords)
+    def chunk_origin(self, key):
+        return key[0] * self.chunk_size, key[1] * self.chunk_size
+
+    # function to add a barrier (index in the barrier field) to every chunk it overlaps
+    def add(self, index):
+        x0, y0, x1, y1 = self.chunk_range(*self.field.map_rect(index))
+        for chunk_x in range(x0, x1 + 1):
+            for chunk_y in range(y0, y1 + 1):
+                key = (chunk_x, chunk_y)
+                self.chunk_barriers.setdefault(key, []).append(index)
+                # barriers are only ever added on top, so a chunk that is already baked
+                # only needs the new barrier drawn onto it
+                surface = self.surfaces.get(key)
+                if surface is not None:
+                    self.field.draw(surface, [index], self.chunk_origin(key))
+
+    # function to add every barrier in the barrier field from index start onwards, all at once
+    def add_all(self, start=0):
+        left, top, extent = self.field.bounding_boxes(start)
+        if len(left) == 0:
+            return
+        # chunks are grouped the same way as the cells of a spatial hash, the barriers in each chunk keep
+        # the order they were added in
+        _, indices, groups = cell_groups(self.chunk_size, left, top, extent, extent, first=start)
+        indices = indices.tolist()
+        for key, group_start, group_end in groups:
+            self.chunk_barriers.setdefault(key, []).extend(indices[group_start:group_end])
+            # any baked surface for this chunk is missing the new barriers, bake it again when it is drawn
+            self.surfaces.pop(key, None)
+
+    # function to update the chunks after barriers are removed from the barrier field (BarrierField.remove)
+    # removed is the same boolean mask, the indices of the barriers left are moved down to match the field
+    def remove(self, removed):
+        removed = np.asarray(removed, dtype=bool)
+        new_indices = np.cumsum(~removed) - 1
+        for key in list(self.chunk_barriers):
+            indices = np.array(self.chunk_barriers[key], dtype=np.intp)
+            keep = ~removed[indices]
+            if not keep.all():
+                # the chunk lost barriers, so its surface has to be baked again
+                self.surfaces.pop(key, None)
+                if not keep.any():
+                    del self.chunk_barriers[key]
+                    continue
+            self.chunk_barriers[key] = new_indices[indices[keep]].tolist()
+
+    # function to draw all of a chunk's barriers onto a new surface
+    def bake(self, key):
+        # match the display's pixel format, if there is one, for faster blits
+        surface = convert_if_possible(pygame.Surface((self.chunk_size, self.chunk_size), pygame.SRCALPHA))
+        surface.fill((0, 0, 0, 0))
+        # draw the chunk's barriers relative to the chunk's corner
+        indices = np.array(self.chunk_barriers[key], dtype=np.intp)
+        self.field.draw(surface, indices, self.chunk_origin(key))
+        self.bakes += 1
+        self.surfaces[key] = surface
+        # drop the least recently drawn surfaces, they will be baked again if they come back on screen
+        while len(self.surfaces) > self.max_surfaces:
+            self.surfaces.popitem(last=False)
+        return surface
+
+    # function to draw the chunks under an area of the map, area is (x, y, width, height) in map coords
+    # (usually the area under the screen), chunks are drawn relative to the camera position
+    # the camera is snapped to whole pixels (rounded down), chunk corners are whole pixels too, so each barrier lands
+    # on the same pixel in every chunk it overlaps and on the same pixel as BarrierField.render would draw it
+    def render(self, surface, camera_position, area):
+        camera_x = math.floor(camera_position[0])
+        camera_y = math.floor(camera_position[1])
+        x0, y0, x1, y1 = self.chunk_range(*area)
+        for chunk_x in range(x0, x1 + 1):
+            for chunk_y in range(y0, y1 + 1):
+                key = (chunk_x, chunk_y)
+                if key not in self.chunk_barriers:
+                    continue
+                chunk_surface = self.surfaces.get(key)
+                if chunk_surface is None:
+                    chunk_surface = self.bake(key)
+                else:
+                    self.surfaces.move_to_end(key)
+                origin_x, origin_y = self.chunk_origin(key)
+                surface.blit(chunk_surface, (origin_x - camera_x, origin_y - camera_y))
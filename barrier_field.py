@@ -0,0 +1,148 @@
+'''
+10/18/2026
+barrier_field.py
+Struct-of-arrays storage for barriers
+'''
+
+import math
+import numpy as np
+import pygame
+
+
+# Define the barrier field class
+# all barriers are stored in contiguous numpy arrays instead of one object per barrier,
+# so culling can be done for every barrier at once with a single mask.
+# the arrays have spare capacity that doubles when full, so appending is amortized O(1)
+class BarrierField:
+    def __init__(self, capacity=1024):
+        self.count = 0  # number of barriers stored
+        self.positions = np.zeros((capacity, 2), dtype=np.float64)  # x and y (top left for squares, center for circles)
+        self.sizes = np.zeros(capacity, dtype=np.float32)  # width and height of squares (pixels)
+        self.shapes = np.zeros(capacity, dtype=np.int8)  # 0 = circle, 1 = square
+        self.colors = np.zeros((capacity, 3), dtype=np.uint8)  # color (RGB)
+        self.circle_radius = 10  # circles are always drawn with this radius (pixels)
+
+    # function to make a barrier field from a list of Barrier objects
+    @classmethod
+    def from_barriers(cls, barriers):
+        field = cls(max(1024, len(barriers)))
+        for barrier in barriers:
+            field.append(barrier.position, barrier.size, barrier.shape, barrier.color)
+        return field
+
+    # function to make a barrier field that uses existing arrays (e.g. memory-mapped from a save) without copying them
+    # the arrays are only copied if more barriers are added than they have room for
+    @classmethod
+    def from_arrays(cls, positions, sizes, shapes, colors):
+        field = cls(0)
+        field.positions = positions
+        field.sizes = sizes
+        field.shapes = shapes
+        field.colors = colors
+        field.count = len(shapes)
+        return field
+
+    def __len__(self):
+        return self.count
+
+    # function to grow the arrays so they can hold at least the given number of barriers
+    def reserve(self, capacity):
+        if capacity <= len(self.shapes):
+            return
+        # double the capacity so repeated appends only copy the arrays O(log n) times
+        new_capacity = max(capacity, 2 * len(self.shapes))
+        for name in ("positions", "sizes", "shapes", "colors"):
+            old = getattr(self, name)
+            new = np.zeros((new_capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+
+    # function to add a barrier, returns the index of the new barrier
+    def append(self, position, size, shape, color):
+        if self.count == len(self.shapes):
+            self.reserve(self.count + 1)
+        index = self.count
+        self.positions[index] = position[0], position[1]
+        self.sizes[index] = size
+        self.shapes[index] = shape
+        self.colors[index] = color[0], color[1], color[2]
+        self.count += 1
+        return index
+
+    # function to add many barriers at once, positions is (n, 2), colors is (n, 3), sizes and shapes can be single values
+    def extend(self, positions, sizes, shapes, colors):
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 2)
+        n = len(positions)
+        self.reserve(self.count + n)
+        end = self.count + n
+        self.positions[self.count:end] = positions
+        self.sizes[self.count:end] = sizes
+        self.shapes[self.count:end] = shapes
+        self.colors[self.count:end] = colors
+        self.count = end
+
+    # function to remove barriers, mask is a boolean array (at least count long) of the barriers to remove
+    # the barriers left are moved down to fill the gaps, keeping their order, so their indices change
+    def remove(self, mask):
+        keep = ~np.asarray(mask[:self.count], dtype=bool)
+        kept = int(keep.sum())
+        for name in ("positions", "sizes", "shapes", "colors"):
+            array = getattr(self, name)
+            array[:kept] = array[:self.count][keep]
+        self.count = kept
+
+    # function to get the bounding box of a barrier on the map (x, y, width, height)
+    def map_rect(self, index):
+        x, y = self.positions[index]
+        if self.shapes[index] == 0:
+            radius = self.circle_radius
+            return x - radius, y - radius, 2 * radius, 2 * radius
+        size = float(self.sizes[index])
+        return x, y, size, size
+
+    # function to get the bounding boxes of the barriers from start to end as arrays (left, top, width/height)
+    def bounding_boxes(self, start=0, end=None):
+        if end is None:
+            end = self.count
+        positions = self.positions[start:end]
+        is_circle = self.shapes[start:end] == 0
+        # circles are centered on their position
+        radius = self.circle_radius
+        left = np.where(is_circle, positions[:, 0] - radius, positions[:, 0])
+        top = np.where(is_circle, positions[:, 1] - radius, positions[:, 1])
+        extent = np.where(is_circle, 2 * radius, self.sizes[start:end])
+        return left, top, extent
+
+    # function to get a mask of the barriers whose bounding box overlaps a rectangle (map coords)
+    def overlap_mask(self, x, y, width, height):
+        left, top, extent = self.bounding_boxes()
+        return (left < x + width) & (left + extent > x) & (top < y + height) & (top + extent > y)
+
+    # function to get the indices of the barriers overlapping a rectangle (map coords), in the order they were added
+    def indices_in_rect(self, x, y, width, height):
+        return np.flatnonzero(self.overlap_mask(x, y, width, height))
+
+    # function to draw some of the barriers, positions are drawn relative to offset (e.g. the camera position)
+    # positions are rounded down (not towards zero), so a barrier is drawn at the same pixel no matter which whole
+    # pixel offset it is drawn relative to, e.g. across the edge between two barrier chunks
+    def draw(self, surface, indices, offset):
+        offset_x, offset_y = offset
+        radius = self.circle_radius
+        # convert the needed rows to python lists once, so the loop doesn't index numpy arrays one value at a time
+        xs = (self.positions[indices, 0] - offset_x).tolist()
+        ys = (self.positions[indices, 1] - offset_y).tolist()
+        sizes = self.sizes[indices].tolist()
+        shapes = self.shapes[indices].tolist()
+        colors = self.colors[indices].tolist()
+        for x, y, size, shape, color in zip(xs, ys, sizes, shapes, colors):
+            if shape == 0:
+                pygame.draw.circle(surface, color, (math.floor(x), math.floor(y)), radius)
+            elif shape == 1:
+                pygame.draw.rect(surface, color, (math.floor(x), math.floor(y), size, size))
+
+    # function to draw only the barriers in an area of the map, area is (x, y, width, height) in map coords
+    # (usually the area under the screen), barriers are drawn relative to the camera position
+    # the camera is snapped to whole pixels the same way as BarrierChunks.render, so both draw the same pixels
+    def render(self, surface, camera_position, area):
+        indices = self.indices_in_rect(*area)
+        self.draw(surface, indices, (math.floor(camera_position[0]), math.floor(camera_position[1])))
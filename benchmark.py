@@ -0,0 +1,239 @@
+'''
+10/18/2026
+benchmark.py
+Headless frame time benchmark for the game world
+Runs a fixed number of update() + render() frames with SDL's dummy video driver and prints frame time
+percentiles as JSON, so runs can be compared between commits without a display.
+
+example:
+    python benchmark.py --barriers 5000 --items 1000 --entities 20 --open-inventories --path circle
+'''
+
+import os
+import json
+import math
+import time
+import random
+import argparse
+
+
+# function to make pygame run headless with SDL's dummy drivers
+# this has to happen before pygame is imported, the other headless scripts (replay.py, vector_bench.py)
+# get it by importing this module before anything that imports pygame
+def use_dummy_drivers():
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    # keep stdout clean so the JSON output can be piped
+    os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+
+# function to print results as JSON, or write them to a file if output (a path) is given
+def write_results(results, output=None):
+    text = json.dumps(results, indent=2)
+    if output:
+        with open(output, "w") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
+
+
+use_dummy_drivers()
+
+import numpy as np
+import pygame
+
+from main import Player, GameStats, GameWorld, create_orbiter, PLAYER_MAX_VELOCITY, PLAYER_SIZE, PLAYER_COLOR
+from barrier_field import BarrierField
+from Items import create_rand_item
+from Inventories import ObjectInventory, PlayerInventory
+from entity_objects import EntityWithInventory
+from assets import assets
+from atlas import atlas
+from world_streaming import WorldStreamer
+from profiler import FrameProfiler
+from simulation import SimulationProcess
+
+
+# function to get the player's velocity on a given frame for the scripted movement paths
+def path_velocity(path, frame, speed):
+    if path == "still":
+        return 0.0, 0.0
+    if path == "line":
+        # move right the whole time
+        return speed, 0.0
+    if path == "circle":
+        # walk around a circle, one lap every 400 frames
+        angle = 2 * math.pi * frame / 400
+        return -math.sin(angle) * speed, math.cos(angle) * speed
+    if path == "zigzag":
+        # move right, switching between up and down every 100 frames
+        return speed, speed if (frame // 100) % 2 else -speed
+    raise ValueError("unknown path: " + path)
+
+
+# function to fill every empty slot of an inventory with random items
+def fill_inventory(inventory, player, items):
+    while inventory.num_items() < inventory.contents.size:
+        item = create_rand_item(True, np.array([0.0, 0.0]), player)
+        x, y = inventory.add_item(item)
+        item.screen_position = np.array(inventory.get_slot_coords(x, y))
+        items.append(item)
+
+
+# function to build a game world for a benchmark scenario
+def build_world(args, screen_size):
+    world_size = args.world_size
+    player = Player(screen_size / 2, np.array([0.0, 0.0]), PLAYER_MAX_VELOCITY, PLAYER_SIZE, PLAYER_COLOR, None)
+
+    # barriers at random positions, same size and color as in main.py
+    barriers = BarrierField(max(1024, args.barriers))
+    barriers.extend(np.random.random((args.barriers, 2)) * world_size, 20, 1, (105, 190, 0))
+
+    # items on the map
+    items = []
+    for _ in range(args.items):
+        map_position = np.array([random.random() * world_size, random.random() * world_size])
+        items.append(create_rand_item(False, map_position, player))
+
+    # entities, each with their own inventory
+    furnace = assets.load(os.path.join('images', 'objects', 'smelter', 'furnace.png'))
+    entities = []
+    world_inventories = []
+    for _ in range(args.entities):
+        position = np.array([random.random() * world_size, random.random() * world_size])
+        contents = np.empty(args.entity_slots, dtype=object)
+        inventory = ObjectInventory(screen_size, contents, args.open_inventories, position, player)
+        world_inventories.append(inventory)
+        entities.append(EntityWithInventory(furnace, position, inventory))
+
+    player_inventory = PlayerInventory(screen_size, np.empty((5, 2), dtype=object), player)
+    if args.open_inventories:
+        # fill the inventories, so every slot has an item to draw
+        player_inventory.is_open = True
+        fill_inventory(player_inventory, player, items)
+        for inventory in world_inventories:
+            fill_inventory(inventory, player, items)
+
+    game_stats = GameStats(screen_size, np.array([world_size, world_size]))
+    game_world = GameWorld(game_stats, player, entities, barriers, player_inventory, world_inventories, items, create_orbiter())
+    game_world.bake_barriers = not args.direct_barriers
+    game_world.dirty_rect_mode = args.dirty_rects
+    if args.stream:
+        game_world.streamer = WorldStreamer(game_world, chunk_size=args.chunk_size, load_radius=args.load_radius)
+    if args.simulation_process:
+        game_world.simulation = SimulationProcess(player, game_world.orbiter)
+    return game_world
+
+
+# function to run the frames and time them
+def run(args):
+    random.seed(args.seed)
+    np.random.seed(args.seed)
+
+    pygame.init()
+    screen_size = np.array([800, 800])
+    screen = pygame.display.set_mode(screen_size)
+    assets.preload_items()
+    if not args.no_atlas:
+        atlas.load_or_build()
+
+    build_start = time.perf_counter()
+    game_world = build_world(args, screen_size)
+    build_time = time.perf_counter() - build_start
+
+    player = game_world.player
+    # the profiler keeps every timed frame, the warmup frames are written over
+    profiler = FrameProfiler(capacity=args.frames)
+    if args.profile:
+        game_world.profiler = profiler
+    frame_times = []
+    for frame in range(args.warmup + args.frames):
+        player.velocity[0], player.velocity[1] = path_velocity(args.path, frame, player.max_velocity)
+        start = time.perf_counter()
+        if args.profile:
+            profiler.begin_frame()
+        game_world.update()
+        if args.profile:
+            profiler.lap("update")
+        # one update per frame, so the camera is drawn at the latest update
+        game_world.interpolate(1.0)
+        dirty_rects = game_world.render(screen)
+        pygame.display.update(dirty_rects)
+        if args.profile:
+            profiler.lap("display")
+            profiler.end_frame()
+        end = time.perf_counter()
+        if frame >= args.warmup:
+            frame_times.append(end - start)
+    game_world.close()
+
+    frame_times = np.array(frame_times) * 1000  # milliseconds
+    results = {
+        "scenario": {
+            "barriers": args.barriers,
+            "items": args.items,
+            "entities": args.entities,
+            "entity_slots": list(args.entity_slots),
+            "open_inventories": args.open_inventories,
+            "direct_barriers": args.direct_barriers,
+            "dirty_rects": args.dirty_rects,
+            "stream": args.stream,
+            "atlas": not args.no_atlas,
+            "simulation_process": args.simulation_process,
+            "path": args.path,
+            "world_size": args.world_size,
+            "frames": args.frames,
+            "warmup": args.warmup,
+            "seed": args.seed,
+        },
+        "build_ms": build_time * 1000,
+        "frame_ms": {
+            "mean": float(frame_times.mean()),
+            "p50": float(np.percentile(frame_times, 50)),
+            "p95": float(np.percentile(frame_times, 95)),
+            "p99": float(np.percentile(frame_times, 99)),
+            "max": float(frame_times.max()),
+        },
+    }
+    if args.profile:
+        # average milliseconds spent in each phase of the frame
+        results["phase_ms"] = profiler.averages()
+    return results
+
+
+# function to parse a slot shape like "5x2"
+def slot_shape(text):
+    x_slots, y_slots = text.lower().split("x")
+    return int(x_slots), int(y_slots)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Headless GameWorld frame time benchmark")
+    parser.add_argument("--frames", type=int, default=500, help="number of timed frames")
+    parser.add_argument("--warmup", type=int, default=50, help="number of untimed frames run first")
+    parser.add_argument("--barriers", type=int, default=1000, help="number of barriers")
+    parser.add_argument("--items", type=int, default=100, help="number of items on the map")
+    parser.add_argument("--entities", type=int, default=10, help="number of entities with inventories")
+    parser.add_argument("--entity-slots", type=slot_shape, default=(1, 1), help="entity inventory size, e.g. 5x2")
+    parser.add_argument("--open-inventories", action="store_true", help="fill and open all inventories")
+    parser.add_argument("--path", choices=["still", "line", "circle", "zigzag"], default="circle",
+                        help="scripted player movement")
+    parser.add_argument("--direct-barriers", action="store_true",
+                        help="draw barriers directly every frame instead of using the pre-baked chunks")
+    parser.add_argument("--no-atlas", action="store_true", help="draw item and entity sprites from their own surfaces")
+    parser.add_argument("--dirty-rects", action="store_true", help="use dirty rectangle rendering")
+    parser.add_argument("--stream", action="store_true", help="only keep the chunks near the player loaded")
+    parser.add_argument("--chunk-size", type=int, default=1024, help="chunk size when streaming (pixels)")
+    parser.add_argument("--load-radius", type=int, default=2, help="chunks to keep loaded around the player when streaming")
+    parser.add_argument("--simulation-process", action="store_true", help="move the player in a worker process")
+    parser.add_argument("--world-size", type=int, default=2000, help="width and height of the area things are placed in")
+    parser.add_argument("--profile", action="store_true", help="also report the average time of each phase of the frame")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("--output", help="file to write the JSON results to (default: print them)")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    results = run(args)
+    write_results(results, args.output)
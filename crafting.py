@@ -0,0 +1,139 @@
+'''
+10/18/2026
+crafting.py
+Recipes and the crafting engine that matches crafting stations against the recipes and crafts when they are done
+'''
+
+from collections import Counter
+
+from Items import item_values
+
+
+# function to get the canonical key for a group of items, given their type names
+# the key is the same no matter what order the items are in, e.g. ("Wood", "Stone", "Wood") -> (("Stone", 1), ("Wood", 2))
+def recipe_key(type_names):
+    return tuple(sorted(Counter(type_names).items()))
+
+
+# Define the recipe class
+# inputs are the type names of the items used up, e.g. ["Wood", "Stone"]
+# output is the keyword arguments for create_item for the item that is made
+# time is how many updates crafting takes, None to use the crafting station's crafting_timer
+class Recipe:
+    def __init__(self, name, inputs, output, time=None):
+        self.name = name
+        self.inputs = list(inputs)
+        self.output = output
+        self.time = time
+        self.key = recipe_key(self.inputs)
+
+
+# Define the recipe book class
+# recipes are stored by the key of their inputs, so finding the recipe for an inventory is one dict lookup
+# no matter how many recipes there are. an inventory matches a recipe when it holds exactly the recipe's inputs
+class RecipeBook:
+    def __init__(self):
+        self.recipes = {}  # recipe key -> Recipe
+
+    def __len__(self):
+        return len(self.recipes)
+
+    # function to add a recipe, only one recipe can use each group of inputs
+    def add(self, recipe):
+        if recipe.key in self.recipes:
+            raise ValueError("a recipe with the same inputs already exists: " + self.recipes[recipe.key].name)
+        self.recipes[recipe.key] = recipe
+
+    # function to get the recipe for an inventory's contents, None if there isn't one
+    def match(self, inventory):
+        if inventory.num_items() == 0:
+            return None
+        return self.recipes.get(recipe_key(item.type_name for item in inventory.item_slots))
+
+
+# Define the crafting engine class
+# the stations are updated by the game world's TickScheduler like any other entity: a station is woken when its
+# inventory changes, and while it is crafting its update asks to be woken again on the tick its recipe is done.
+# so stations that aren't changing or finishing cost nothing, and far away stations wait like other entities
+class CraftingEngine:
+    def __init__(self, recipe_book, scheduler):
+        self.recipe_book = recipe_book
+        self.scheduler = scheduler  # TickScheduler that updates the stations, its tick count is the crafting clock
+        self.checked_versions = {}  # station -> inventory version it was last matched at
+        self.done = {}  # station -> tick its recipe is done on, for the stations that are crafting
+        self.consumed = []  # items used up since take_results was last called
+        self.produced = []  # items made since take_results was last called
+
+    def __len__(self):
+        return len(self.checked_versions)
+
+    # function to add a crafting station (a CraftingEntity that can craft), other entities are ignored
+    def add_station(self, station):
+        if not getattr(station, "can_craft", False) or station in self.checked_versions:
+            return
+        self.checked_versions[station] = -1
+        station.crafting_engine = self
+
+    # function to remove a station, anything it was crafting is dropped
+    def remove_station(self, station):
+        if self.checked_versions.pop(station, None) is None:
+            return
+        self.done.pop(station, None)
+        station.crafting_engine = None
+        station.is_crafting = False
+        station.recipe = None
+
+    # function to match a station's inventory against the recipes, starting or stopping crafting
+    def check(self, station):
+        self.checked_versions[station] = station.inventory.version
+        recipe = self.recipe_book.match(station.inventory)
+        if recipe is not None and recipe is station.recipe and station.is_crafting:
+            # still the same recipe (e.g. the items were moved around), keep going
+            return
+        station.recipe = recipe
+        station.is_crafting = recipe is not None
+        self.done.pop(station, None)
+        if station.is_crafting:
+            time = recipe.time if recipe.time is not None else station.crafting_timer
+            # the tick the recipe is matched on counts as its first update
+            self.done[station] = self.scheduler.tick + max(1, time) - 1
+
+    # function to update a station, called from its update() by the scheduler
+    # matches the inventory if it changed and crafts if the recipe is done,
+    # returns the number of ticks until the recipe is done, or None if the station isn't crafting
+    def update_station(self, station):
+        if station.inventory.version != self.checked_versions[station]:
+            self.check(station)
+        tick = self.scheduler.tick
+        if station.is_crafting and self.done[station] <= tick:
+            used, made = station.craft()
+            self.consumed.extend(used)
+            self.produced.extend(made)
+            # the outputs may be the inputs of another recipe
+            self.check(station)
+        if station.is_crafting:
+            return self.done[station] - tick
+        return None
+
+    # function to get the items used up and made since it was last called, so they can be removed from and added
+    # to the game world, returns (items used up, items made)
+    def take_results(self):
+        consumed, produced = self.consumed, self.produced
+        self.consumed = []
+        self.produced = []
+        return consumed, produced
+
+
+# function to make the keyword arguments for create_item for a common item of a type
+def common_item(item_type, type_name):
+    return {"rarity": "Common", "item_type": item_type, "type_name": type_name, "value": item_values["Common"][0],
+            "description": "A crafted " + type_name.lower() + "."}
+
+
+# the recipes used by the game
+recipes = RecipeBook()
+recipes.add(Recipe("Carve statue", ["Stone"], common_item("Miscellaneous", "Statue")))
+recipes.add(Recipe("Make axe", ["Wood", "Stone"], common_item("Weapon", "Axe")))
+recipes.add(Recipe("Make sword", ["Wood", "Stone", "Stone"], common_item("Weapon", "Sword")))
+recipes.add(Recipe("Make helmet", ["Stone", "Stone", "Stone"], common_item("Armor", "Helmet")))
+recipes.add(Recipe("Brew potion", ["Wood", "Wood"], common_item("Consumable", "Potion"), time=200))
@@ -8,6 +8,11 @@ import pygame
 import random
 import numpy as np
 
+from sprite_cache import get_scaled
+from assets import assets
+from atlas import atlas
+from Items import create_item
+
 
 # Define the entity class
 # This is a base class for entities with inventories
@@ -18,6 +23,8 @@ class EntityWithInventory:
         self.inventory = inventory
         self.width = 100  # pixels, used to scale the entity's image
         self.height = self.image.get_height() * self.width / self.image.get_width()
+        # (atlas page, rectangle) of the image at the size it is drawn at, None if it isn't in the atlas
+        self.sprite = atlas.sprite(assets.path_of(image), (self.width, int(self.height)))
 
     # function to get height based on the image and desired width
     def get_height(self):
@@ -25,10 +32,13 @@ class EntityWithInventory:
 
     # update function
     # for crafting and other things
+    # called by the game world's TickScheduler, returns the number of ticks until the entity
+    # should be updated again, or None to sleep until it is woken up (the game world wakes it when its inventory changes)
     def update(self):
         # update the inventory
         # print("entity update")
-        pass
+        # nothing to do yet, so sleep
+        return None
 
     # bounding box for when the entity is on the map
     def bounding_box(self, camera_position):
@@ -45,10 +55,14 @@ class EntityWithInventory:
         # width, height = self.image.get_size()
         # desired_height = int(height * desired_width / width)
         desired_height = int(self.height)
-        smaller_image = pygame.transform.scale(self.image, (desired_width, desired_height))
         # Update position based on player position
         barr_x = self.position[0] - camera_position[0]
         barr_y = self.position[1] - camera_position[1]
+        if self.sprite is not None:
+            # the entity's part of the atlas page
+            window.blit(self.sprite[0], (barr_x, barr_y), self.sprite[1])
+            return
+        smaller_image = get_scaled(self.image, (desired_width, desired_height))
         window.blit(smaller_image, (barr_x, barr_y))
 
     # render the inventory
@@ -60,18 +74,41 @@ class EntityWithInventory:
 # Define the crafting entity class
 # This uses the entity class as a base class
 class CraftingEntity(EntityWithInventory):
-    def __init__(self, image, position, inventory):
+    def __init__(self, image, position, inventory, can_craft=True):
         super().__init__(image, position, inventory)
-        self.can_craft = False  # boolean, whether the entity can craft or not
+        self.can_craft = can_craft  # boolean, whether the entity can craft or not
         # player inventories, chests, etc. will have this set to False
         # crafting tables, smelters, etc. will have this set to True
         self.is_crafting = False  # boolean, whether the entity is crafting or not
-        self.crafting_timer = 100  # frames
+        self.crafting_timer = 100  # updates, how long crafting takes for recipes that don't set their own time
+        self.recipe = None  # recipe being crafted, None if not crafting
+        # the crafting engine (crafting.py) matches the inventory against the recipes and runs the timer,
+        # set when the entity is added to one
+        self.crafting_engine = None
+
+    # update function, called by the game world's TickScheduler
+    # returns the number of ticks until the recipe being crafted is done, or None to sleep until the inventory changes
+    def update(self):
+        if self.crafting_engine is None:
+            return None
+        return self.crafting_engine.update_station(self)
 
     # crafting function
+    # called by the crafting engine when the recipe's timer runs out
+    # returns (items used up, items made)
     def craft(self):
-        # in order to craft, the entity must have the correct items
-        # in the correct order. The items are removed from the inventory
-        # and the crafted item is added to the inventory
-
-        pass
+        # in order to craft, the inventory must hold exactly the recipe's items (in any order).
+        # The items are removed from the inventory and the crafted item is added to the inventory
+        recipe = self.recipe
+        self.recipe = None
+        self.is_crafting = False
+        if recipe is None:
+            return [], []
+        used = list(self.inventory.item_slots)
+        for item in used:
+            x, y = self.inventory.get_item_slot(item)
+            self.inventory.set_slot(x, y, None)
+            item.in_inventory = False
+        made = create_item(True, self.inventory.map_position, **recipe.output)
+        self.inventory.add_item(made)
+        return used, [made]
@@ -0,0 +1,107 @@
+'''
+10/18/2026
+hud.py
+Heads up display text (FPS counter, stats, etc.)
+Fonts are made once, each character is rendered once, and a label is only redrawn when its text changes
+'''
+
+import pygame
+
+
+# fonts that have been made, (name, size) -> pygame font
+# pygame.font.SysFont is slow, so each font should only be made once
+fonts = {}
+
+
+# function to get a font, making it the first time it is asked for
+def get_font(name="Arial", size=20):
+    font = fonts.get((name, size))
+    if font is None:
+        font = fonts[(name, size)] = pygame.font.SysFont(name, size)
+    return font
+
+
+# Define the glyph cache class
+# holds a rendered surface for each character of a font and color
+class GlyphCache:
+    def __init__(self, font, color, antialias=True):
+        self.font = font
+        self.color = color
+        self.antialias = antialias
+        self.glyphs = {}  # character -> rendered surface
+
+    # function to get the surface for a character, rendering it the first time
+    def get(self, character):
+        glyph = self.glyphs.get(character)
+        if glyph is None:
+            glyph = self.glyphs[character] = self.font.render(character, self.antialias, self.color)
+        return glyph
+
+    # function to draw a string by putting the character surfaces side by side
+    def render(self, text):
+        glyphs = [self.get(character) for character in text]
+        width = sum(glyph.get_width() for glyph in glyphs)
+        surface = pygame.Surface((max(width, 1), self.font.get_height()), pygame.SRCALPHA)
+        x = 0
+        for glyph in glyphs:
+            surface.blit(glyph, (x, 0))
+            x += glyph.get_width()
+        return surface
+
+
+# Define the label class
+# a piece of text at a fixed position on the screen
+class Label:
+    def __init__(self, glyphs, position, text=""):
+        self.glyphs = glyphs  # GlyphCache used to draw the text
+        self.position = position  # top left corner on the screen
+        self.text = None
+        self.surface = None
+        self.set_text(text)
+
+    # function to change the text, the label is only redrawn if the text is different
+    def set_text(self, text):
+        if text != self.text:
+            self.text = text
+            self.surface = self.glyphs.render(text)
+
+    # function to get the screen rectangle the label is drawn in
+    def get_rect(self):
+        return self.surface.get_rect(topleft=self.position)
+
+    def render(self, surface):
+        return surface.blit(self.surface, self.position)
+
+
+# Define the HUD class
+# keeps the labels that are drawn on top of the game world
+class Hud:
+    def __init__(self, font_name="Arial", font_size=20, color=(155, 155, 255)):
+        self.font = get_font(font_name, font_size)
+        self.glyph_caches = {}  # color -> GlyphCache
+        self.color = color  # default text color
+        self.labels = {}  # name -> Label, drawn in the order they were added
+        self.visible = True
+
+    # function to get the glyph cache for a color
+    def get_glyphs(self, color):
+        glyphs = self.glyph_caches.get(color)
+        if glyphs is None:
+            glyphs = self.glyph_caches[color] = GlyphCache(self.font, color)
+        return glyphs
+
+    # function to add a label at a position on the screen
+    def add_label(self, name, position, text="", color=None):
+        label = Label(self.get_glyphs(color or self.color), position, text)
+        self.labels[name] = label
+        return label
+
+    # function to change the text of a label
+    def set_text(self, name, text):
+        self.labels[name].set_text(text)
+
+    # function to draw all labels, returns the screen rectangles that were drawn to
+    def render(self, surface):
+        if not self.visible:
+            return []
+        return [label.render(surface) for label in self.labels.values()]
@@ -7,17 +7,34 @@ The player will be able to move around the map and interact with objects and NPC
 
 # imports, imports, imports (and more imports)
 import time
+# when the imports started, for the --startup-profile report
+IMPORT_START = time.perf_counter()
 import numpy as np
 import random
 import math
 import pygame
 import sys
 import os
+import argparse
 
 # game file imports
-from Items import *
-from Inventories import *
-from entity_objects import *
+# (the recording and the simulation worker are only imported when they are turned on)
+from Items import Item, item_types, create_rand_item, spawn_items
+from Inventories import ObjectInventory, PlayerInventory
+from entity_objects import EntityWithInventory, CraftingEntity
+from spatial_hash import SpatialHash
+from barrier_chunks import BarrierChunks
+from barrier_field import BarrierField
+from sprite_cache import scaled_cache
+from assets import assets
+from atlas import atlas
+from hud import Hud
+from timestep import FixedTimestep
+from world_streaming import WorldStreamer
+from world_store import save_world, load_world, decode_items, decode_entities, decode_inventory
+from crafting import CraftingEngine, recipes
+from scheduler import TickScheduler
+from profiler import FrameProfiler, StartupTimer
 
 
 # Define the player class
@@ -29,11 +46,27 @@ class Player:
         self.size = size # radius (pixels)
         self.color = color # color (RGB)
         self.item_in_hand = item_in_hand # item in hand, None if nothing
+        self.previous_position = position.copy() # position before the last update, for interpolation
+        self.view_position = position.copy() # position the camera is centered on, between previous_position and position
 
+    # the game is updated at a fixed rate, so velocity is in pixels per update
     def update(self):
         # Update the player's position based on their velocity
+        self.previous_position[:] = self.position
         self.position += self.velocity
 
+    # set the position the camera is centered on, alpha is how far (0 to 1) from the previous update to the last one
+    # view_position is updated in place with scalar math, numpy arrays this small cost more to make than to add up
+    def interpolate(self, alpha):
+        position_x, position_y = self.position.tolist()
+        if alpha >= 1:
+            self.view_position[0] = position_x
+            self.view_position[1] = position_y
+        else:
+            previous_x, previous_y = self.previous_position.tolist()
+            self.view_position[0] = previous_x + (position_x - previous_x) * alpha
+            self.view_position[1] = previous_y + (position_y - previous_y) * alpha
+
     def render(self, surface, screen_size):
         # Draw the player on the given surface
         # pygame.draw.circle(surface, self.color, (int(self.position[0]), int(self.position[1])), self.size)
@@ -47,9 +80,12 @@ class Player:
         item = self.item_in_hand
         self.item_in_hand = None
         # update the item's map position with an offset based on the size of the item's image
-        item.map_position = game_wrld.screen_to_map(mouse_position) - np.array([item.image.get_width()/2, item.image.get_height()/2])
+        map_x, map_y = game_wrld.screen_to_map(mouse_position)
+        item.map_position = (map_x - item.image.get_width()/2, map_y - item.image.get_height()/2)
         item.in_hand = False
         item.in_inventory = False
+        # the item is back on the map, so add it to the world's spatial index
+        game_wrld.add_map_item(item)
 
 
 # class for an orbiting object around an entity
@@ -61,17 +97,31 @@ class Orbiter:
         self.speed = speed # speed of rotation
         self.color = color # color (RGB)
         self.angle = 0  # Initialize the angle to 0
+        self.previous_angle = 0  # angle before the last update, for interpolation
+        self.view_angle = 0  # angle to draw at, between previous_angle and angle
 
+    # the game is updated at a fixed rate, so speed is in radians per update
     def update(self):
         # Update the angle based on the speed
+        self.previous_angle = self.angle
         self.angle += self.speed
 
+    # set the angle to draw at, alpha is how far (0 to 1) from the previous update to the last one
+    def interpolate(self, alpha):
+        self.view_angle = self.previous_angle + (self.angle - self.previous_angle) * min(alpha, 1)
+
     def render(self, surface, center):
         # Draw the Orbiter on the given surface
-        x = center[0] + math.cos(self.angle) * self.radius
-        y = center[1] + math.sin(self.angle) * self.radius
+        x = center[0] + math.cos(self.view_angle) * self.radius
+        y = center[1] + math.sin(self.view_angle) * self.radius
         pygame.draw.circle(surface, self.color, (int(x), int(y)), self.size)
 
+    # get the screen rectangle that the orbiter is drawn in
+    def get_rect(self, center):
+        x = int(center[0] + math.cos(self.view_angle) * self.radius)
+        y = int(center[1] + math.sin(self.view_angle) * self.radius)
+        return pygame.Rect(x - self.size - 1, y - self.size - 1, 2 * self.size + 2, 2 * self.size + 2)
+
 
 # Define the barrier class
 # these don't move, and currently act only as part of the background
@@ -105,58 +155,112 @@ class GameStats:
 
 # Define the game world class
 class GameWorld:
-    def __init__(self, game_stats, player, entities, barriers, player_inventory, world_inventories, items):
+    def __init__(self, game_stats, player, entities, barriers, player_inventory, world_inventories, items, orbiter=None):
+        self.game_stats = game_stats
         self.screen_size = game_stats.screen_size # display size (pixels, x by y, numpy array)
+        # half the display size as plain floats, for the per object screen math (so it doesn't make numpy arrays)
+        self.half_screen = (float(self.screen_size[0]) / 2, float(self.screen_size[1]) / 2)
         self.size = game_stats.size # game world dimensions (pixels, x by y)
         self.player = player
+        self.orbiter = orbiter # object orbiting the player, None if there isn't one
         self.entities = entities # list of entities
-        self.barriers = barriers # list of barriers
+        # barriers are kept in a BarrierField (arrays of positions, sizes, shapes and colors),
+        # a list of Barrier objects can also be passed in and is copied into one
+        if not isinstance(barriers, BarrierField):
+            barriers = BarrierField.from_barriers(barriers)
+        self.barriers = barriers
         self.player_inventory = player_inventory # player's inventory, only one of these exists
         self.world_inventories = world_inventories # list of inventories on the map (not including player's inventory)
         self.items = items
 
+        # spatial indexes, so culling and area queries only look at the part of the map being asked about
+        # one index per layer so each layer can still be drawn in its own order
+        self.cell_size = 200  # pixels, size of each spatial index cell
+        self.entity_grid = SpatialHash(self.cell_size)
+        self.item_grid = SpatialHash(self.cell_size)  # only items that are on the map (not in an inventory or hand)
+        # barriers don't move, so they are drawn once onto cached chunk surfaces
+        # (barriers are culled with the barrier field's vectorized mask instead of a spatial index)
+        self.barrier_chunks = BarrierChunks(self.barriers)
+        self.barrier_chunks.add_all()
+        self.bake_barriers = True  # False to draw the on screen barriers directly every frame instead of using the chunks
+
+        # dirty rectangle rendering, when on only the parts of the screen that changed are redrawn
+        # while the camera is still, and render returns just those rectangles
+        self.dirty_rect_mode = False
+        self.full_redraw = True  # True to redraw the whole screen on the next frame
+        self.marked_rects = []  # screen rectangles marked to be redrawn on the next frame
+        self.last_camera = None  # camera position of the last frame
+        self.last_open_inventories = None  # which inventories were open on the last frame
+        self.last_moving_rects = []  # where the orbiter and held item were drawn on the last frame
+
+        # updates entities only when they are due and near the player, instead of every entity every update
+        self.scheduler = TickScheduler()
+        # matches crafting entities against the recipes, the scheduler updates them when they have something to do
+        self.crafting = CraftingEngine(recipes, self.scheduler)
+
+        # WorldStreamer that loads the map around the player and puts far away chunks on disk, None to keep everything loaded
+        self.streamer = None
+        # FrameProfiler to time each layer of the render with, None to not time them
+        self.profiler = None
+        # SimulationProcess that moves the player and orbiter in a worker process, None to move them in update
+        self.simulation = None
+        # last known mouse position on the screen, set from the mouse events
+        self.mouse_position = (0, 0)
+        for entity in self.entities:
+            self.add_entity_to_grid(entity)
+            self.schedule_entity(entity)
+        for item in self.items:
+            if not item.in_inventory and not item.in_hand:
+                self.add_map_item(item)
+
     def update(self):
         # Update the player and entities
-        self.player.update()
-        for entity in self.entities:
-            entity.update()
+        if self.simulation is not None:
+            # the worker process moves the player and orbiter, take its latest step and ask for the next one
+            self.simulation.sync(self.player, self.orbiter)
+            self.simulation.request_step(self.player, self.orbiter)
+        else:
+            self.player.update()
+        # load the chunks the player is moving towards and evict the ones they left behind
+        if self.streamer is not None:
+            self.streamer.update()
+        self.scheduler.update(self.player.position)
+        # swap the items used up by crafting stations that were updated for the crafted ones
+        consumed, produced = self.crafting.take_results()
+        if consumed or produced:
+            self.remove_items(consumed)
+            self.add_items(produced)
         # Update the orbiting object
-        orbiter.update()
+        if self.orbiter is not None and self.simulation is None:
+            self.orbiter.update()
 
     def check_if_on_screen(self, position, object_width=0, object_height=0):
         # object_width and height correspond to the object's image
         # update the position by half of the object image width and height
-        position = position + np.array([object_width, object_height]) / 2
+        # (done with plain floats, this is called for every object on screen)
+        x = position[0] + object_width / 2
+        y = position[1] + object_height / 2
         # Check if the given position is on the screen
-        # position is a numpy array
-        if self.player.position[0] - self.screen_size[0] / 2 < position[0] < self.player.position[0] + self.screen_size[0] / 2:
-            if self.player.position[1] - self.screen_size[1] / 2 < position[1] < self.player.position[1] + self.screen_size[1] / 2:
-                return True
-        return False
+        camera_x, camera_y = self.camera_xy()
+        return camera_x < x < camera_x + 2 * self.half_screen[0] and camera_y < y < camera_y + 2 * self.half_screen[1]
 
     # function to convert screen coords to map coords
     def screen_to_map(self, screen_position):
-        # position is a numpy array
-        return screen_position + self.player.position - self.screen_size / 2
+        # position is anything with an x and y (numpy array, tuple, etc.), returns a tuple of floats
+        camera_x, camera_y = self.camera_xy()
+        return screen_position[0] + camera_x, screen_position[1] + camera_y
 
     # function to make a list of items in an inventory
     def get_inventory_items(self, inventory):
-        # get the number of slots in the inventory
-        x_slots = len(inventory.contents)
-        y_slots = len(inventory.contents[0])
-        # loop through the slots
-        items_in_inventory = []
-        for x in range(x_slots):
-            for y in range(y_slots):
-                # if the slot is not empty, add the item to the list
-                if inventory.contents[x][y] is not None:
-                    items_in_inventory.append(inventory.contents[x][y])
-        return items_in_inventory
+        # the inventory keeps track of which items it holds, so there's no need to loop over the slots
+        return list(inventory.item_slots)
 
     # function to run whenever the mouse button is released
     def mouse_button_up(self, event):
         # Set the mouse_button_released variable to True
-        game_stats.mouse_button_released = True
+        self.game_stats.mouse_button_released = True
+        # clicks can move items between the map, the hand and inventories, so redraw everything
+        self.request_full_redraw()
         # get the mouse position from event argument
         mouse_pos = event.pos
 
@@ -174,7 +278,7 @@ class GameWorld:
             # and if the player is holding an item
             if self.player.item_in_hand is not None:
                 # drop the item, passing in the mouse position and game world
-                self.player.drop_item_to_map(event.pos, game_world)
+                self.player.drop_item_to_map(event.pos, self)
 
         # there is an open inventory, so check if there is an item in the player's hand
         elif self.player.item_in_hand is not None:
@@ -185,19 +289,25 @@ class GameWorld:
                 # check if the mouse is in the inventory's bounding box
                 if inventory.mouse_over(mouse_pos):
                     # run the inventory's place_item function
-                    inventory.place_item(self.player.item_in_hand, mouse_pos, self.player)
+                    item = self.player.item_in_hand
+                    inventory.place_item(item, mouse_pos, self.player)
                     item_placed = True
+                    # if the inventory was full the item was dropped to the map at the player's position
+                    if not item.in_inventory:
+                        self.add_map_item(item)
                 # if the mouse is not in the inventory's bounding box, continue to the next inventory
                 else:
                     continue
             # if the item has not been placed, drop it to the map
             if not item_placed:
-                self.player.drop_item_to_map(event.pos, game_world)
+                self.player.drop_item_to_map(event.pos, self)
 
     # function to run whenever the mouse button is pressed
     def mouse_button_down(self, event):
         # Set the mouse_button_released variable to False
-        game_stats.mouse_button_released = False
+        self.game_stats.mouse_button_released = False
+        # clicks can move items between the map, the hand and inventories, so redraw everything
+        self.request_full_redraw()
         mouse_pos = event.pos
         mouse_x, mouse_y = mouse_pos
 
@@ -210,76 +320,55 @@ class GameWorld:
         if self.player_inventory.is_open:
             open_inventories.append(self.player_inventory)
 
-        # get a list of all items on the map for when the mouse is not over an inventory
-        items_on_screen = self.items_on_screen()
-
         # if there is an open inventory, check if the player is clicking on an item in the inventory
         mouse_over_inventory = False
-        if len(open_inventories) > 0:
-            for inventory in open_inventories:
-                # check if the mouse is in the inventory's bounding box
-                if inventory.mouse_over(mouse_pos):
-                    mouse_over_inventory = True
-                    print("mouse clicked over an inventory")
-                    # make a list of items in the inventory
-                    items_in_inventory = self.get_inventory_items(inventory)
-                    # check if the player is clicking on an item in the inventory
-                    for item1 in items_in_inventory:
-                        # if this is not the player's inventory
-                        if inventory is not self.player_inventory:
-                            # check if the mouse is in the item's bounding box
-                            if item1.bounding_box_inventory(player.position).collidepoint(mouse_x, mouse_y):
-                                print("clicked on item in inventory")
-                                # if so run the inventory's item to hand function:
-                                inventory.item_to_hand(item1, self.player, mouse_pos)
-                                # break out of the for loop
-                                break
-                        # if this is the player's inventory
-                        else:
-                            # check if the mouse is in the item's bounding box
-                            if item1.bounding_box_player_inventory().collidepoint(mouse_x, mouse_y):
-                                print("clicked on item in the player's inventory")
-                                # if so run the inventory's item to hand function:
-                                inventory.item_to_hand(item1, self.player, mouse_pos)
-                                # break out of the for loop
-                                break
-                    # break out of the for loop
-                    break
-            # if the mouse is not over an inventory, check if the player is clicking on an item on the map
-            if not mouse_over_inventory:
-                # check if the player is clicking on an item on the map
-                for item in items_on_screen:
-                    # check if the mouse is in the item's bounding box
-                    camera_position = self.get_camera_position()
-                    if item.bounding_box(camera_position).collidepoint(mouse_x, mouse_y):
-                        # if so, set the item to be in hand
-                        item.in_hand = True
-                        player.item_in_hand = item
-                        # set the item's map_position to the mouse position
-                        item.screen_position = np.array([mouse_x, mouse_y])
-                        # break out of the for loop
-                        break
-        # if all inventories are closed
-        else:
-            # check if the player is clicking on an item on the map
-            for item in items_on_screen:
-                # check if the mouse is in the item's bounding box
-                camera_position = self.get_camera_position()
-                if item.bounding_box(camera_position).collidepoint(mouse_x, mouse_y):
-                    # if so, set the item to be in hand
-                    item.in_hand = True
-                    player.item_in_hand = item
-                    # set the item's map_position to the mouse position
-                    item.screen_position = np.array([mouse_x, mouse_y])
-                    # break out of the for loop
-                    break
+        for inventory in open_inventories:
+            # check if the mouse is in the inventory's bounding box
+            if inventory.mouse_over(mouse_pos):
+                mouse_over_inventory = True
+                print("mouse clicked over an inventory")
+                # work out which slot was clicked from the mouse position, instead of checking every item
+                x, y = inventory.slot_at(mouse_pos)
+                if x is not None and inventory.contents[x, y] is not None:
+                    print("clicked on item in inventory")
+                    # if so run the inventory's item to hand function:
+                    inventory.item_to_hand(inventory.contents[x, y], self.player, mouse_pos)
+                # break out of the for loop
+                break
+
+        # if the mouse is not over an inventory, check if the player is clicking on an item on the map
+        if not mouse_over_inventory:
+            item = self.pick_map_item(mouse_pos)
+            if item is not None:
+                # if so, set the item to be in hand
+                item.in_hand = True
+                self.player.item_in_hand = item
+                # the item is no longer on the map
+                self.remove_map_item(item)
+                # set the item's map_position to the mouse position
+                item.screen_position = np.array([mouse_x, mouse_y])
+
+    # get the item on the map under a screen position, None if there isn't one
+    # if items overlap, the one drawn on top is picked
+    def pick_map_item(self, screen_position):
+        map_x, map_y = self.screen_to_map(screen_position)
+        # any item covering the point is stored in the spatial index cell the point is in
+        # items come out in draw order, so check them from the top down
+        for item in reversed(self.item_grid.query_point(map_x, map_y)):
+            if item.in_hand or item.in_inventory:
+                continue
+            item_x, item_y = item.map_x, item.map_y
+            if item_x <= map_x < item_x + item.width and item_y <= map_y < item_y + item.height:
+                return item
+        return None
 
     # get a list of all items on the map that are also visible on the screen and not in an inventory
     def items_on_screen(self):
         items_on_screen = []
-        # Check if any items on the map are also on the screen, then add them to the list
-        for item in self.items:
-            if self.check_if_on_screen(item.map_position):
+        # only items in the spatial index cells under the camera need to be checked
+        camera_position = self.camera_xy()
+        for item in self.item_grid.query(camera_position[0], camera_position[1], self.screen_size[0], self.screen_size[1]):
+            if self.check_if_on_screen((item.map_x, item.map_y)):
                 # and the item is not in an inventory
                 if not item.in_inventory:
                     items_on_screen.append(item)
@@ -287,44 +376,288 @@ class GameWorld:
 
     def get_camera_position(self):
         # Get the position of the camera
-        # This is the position of the player's center
-        return self.player.position - self.screen_size / 2
+        # This is the position of the player's center (as drawn, which can be between two updates)
+        return np.array(self.camera_xy())
+
+    # the camera position as a tuple of floats, for the per frame and per object math
+    def camera_xy(self):
+        view_x, view_y = self.player.view_position.tolist()
+        return view_x - self.half_screen[0], view_y - self.half_screen[1]
+
+    # set how far (0 to 1) between the last two updates things should be drawn
+    # the game is updated at a fixed rate, and frames can be drawn in between updates
+    def interpolate(self, alpha):
+        if self.simulation is not None:
+            self.simulation.sync(self.player, self.orbiter)
+        self.player.interpolate(alpha)
+        if self.orbiter is not None:
+            self.orbiter.interpolate(alpha)
+
+    # add (or move) an item on the map in the item spatial index
+    # called whenever an item ends up on the map, e.g. when it is dropped
+    def add_map_item(self, item):
+        self.item_grid.insert(item, item.map_x, item.map_y, item.width, item.height)
+        self.request_full_redraw()
+
+    # add new items to the world, all at once
+    # items that are on the map are added to the item spatial index
+    # positions can be passed in as an (n, 2) array of the items' map positions, if they are all on the map and 100x100
+    def add_items(self, items, positions=None):
+        self.items.extend(items)
+        if positions is None:
+            map_items = [item for item in items if not item.in_inventory and not item.in_hand]
+            if map_items:
+                positions = np.array([(item.map_x, item.map_y) for item in map_items], dtype=np.float64)
+                widths = np.array([item.width for item in map_items])
+                heights = np.array([item.height for item in map_items])
+                self.item_grid.insert_many(map_items, positions[:, 0], positions[:, 1], widths, heights)
+        else:
+            self.item_grid.insert_many(items, positions[:, 0], positions[:, 1], 100, 100)
+        self.request_full_redraw()
+
+    # remove an item from the item spatial index, e.g. when it is picked up
+    def remove_map_item(self, item):
+        self.item_grid.remove(item)
+        self.request_full_redraw()
+
+    # remove items from the world completely (e.g. when their chunk is evicted)
+    def remove_items(self, items):
+        if not items:
+            return
+        removed = set(items)
+        for item in removed:
+            self.item_grid.remove(item)
+        self.items = [item for item in self.items if item not in removed]
+        self.request_full_redraw()
+
+    # add (or move) an entity in the entity spatial index
+    # call this again whenever an entity's position changes
+    def add_entity_to_grid(self, entity):
+        self.entity_grid.insert(entity, entity.position[0], entity.position[1], entity.width, entity.height)
+
+    # start updating an entity with the scheduler, it is woken up whenever its inventory changes
+    def schedule_entity(self, entity):
+        self.crafting.add_station(entity)
+        self.scheduler.add(entity)
+        if entity.inventory is not None:
+            entity.inventory.on_change = lambda: self.scheduler.wake(entity)
+
+    # add a new entity to the world, along with its inventory
+    # the items in the inventory are not added to the world's items, use add_items for them
+    def add_entity(self, entity):
+        self.entities.append(entity)
+        self.add_entity_to_grid(entity)
+        self.schedule_entity(entity)
+        if entity.inventory is not None:
+            self.world_inventories.append(entity.inventory)
+        self.request_full_redraw()
+
+    # remove entities from the world, along with their inventories and the items in them
+    def remove_entities(self, entities):
+        if not entities:
+            return
+        removed = set(entities)
+        inventories = set()
+        items = []
+        for entity in removed:
+            self.entity_grid.remove(entity)
+            self.crafting.remove_station(entity)
+            self.scheduler.remove(entity)
+            if entity.inventory is not None:
+                entity.inventory.on_change = None
+                inventories.add(entity.inventory)
+                items.extend(self.get_inventory_items(entity.inventory))
+        self.entities = [entity for entity in self.entities if entity not in removed]
+        self.world_inventories = [inventory for inventory in self.world_inventories if inventory not in inventories]
+        self.remove_items(items)
+        self.request_full_redraw()
+
+    # add many barriers at once, positions is (n, 2), colors is (n, 3), sizes and shapes can be single values
+    def add_barriers(self, positions, sizes, shapes, colors):
+        start = self.barriers.count
+        self.barriers.extend(positions, sizes, shapes, colors)
+        self.barrier_chunks.add_all(start)
+        self.request_full_redraw()
+
+    # remove barriers, mask is a boolean array of the barriers to remove
+    # the indices of the barriers left change (see BarrierField.remove)
+    def remove_barriers(self, mask):
+        if not mask.any():
+            return
+        self.barriers.remove(mask)
+        self.barrier_chunks.remove(mask)
+        self.request_full_redraw()
+
+    # get the barriers, entities and map items in an area of the map
+    # position is the top left corner of the area (map coords), size is the width and height
+    # barriers are returned as indices into the barrier field
+    # entities and items only checks the spatial index cells under the area, so objects close to the area may also be returned
+    def objects_in_area(self, position, size):
+        x, y = position
+        width, height = size
+        barriers = self.barriers.indices_in_rect(x, y, width, height)
+        entities = self.entity_grid.query(x, y, width, height)
+        items = self.item_grid.query(x, y, width, height)
+        return barriers, entities, items
+
+    # get everything in the spatial index cells under the camera
+    def objects_on_screen(self):
+        camera_position = self.camera_xy()
+        return self.objects_in_area(camera_position, self.screen_size)
+
+    # save the world to a folder (see world_store.save_world)
+    def save(self, directory):
+        if self.simulation is not None:
+            # save where the player is after every step asked for
+            self.simulation.wait()
+            self.simulation.sync(self.player, self.orbiter)
+        save_world(self, directory)
+
+    # function to stop the simulation worker and remove the streamed chunks on disk, when the world won't be used again
+    def close(self):
+        if self.simulation is not None:
+            self.simulation.stop()
+            self.simulation = None
+        if self.streamer is not None:
+            self.streamer.store.close()
 
     # create a barrier
     def create_barrier(self, position, size, shape, color):
-        # create a barrier object and add it to the list of barriers
-        self.barriers.append(Barrier(position, size, shape, color))
+        # add the barrier to the barrier field, and draw it onto its chunks
+        index = self.barriers.append(position, size, shape, color)
+        self.barrier_chunks.add(index)
+        # redraw where the new barrier is on the screen
+        x, y, width, height = self.barriers.map_rect(index)
+        camera_position = self.camera_xy()
+        self.mark_dirty((x - camera_position[0] - 1, y - camera_position[1] - 1, width + 2, height + 2))
+
+    # function to redraw everything that was drawn from images that have just finished loading (see assets.poll)
+    def refresh_images(self):
+        # inventory panels have their items' images drawn on them
+        self.player_inventory.panel = None
+        for inventory in self.world_inventories:
+            inventory.panel = None
+        for entity in self.entities:
+            if entity.inventory:
+                entity.inventory.panel = None
+        self.request_full_redraw()
+
+    # function to ask for the whole screen to be redrawn on the next frame
+    # used when something changes that the dirty rectangles don't track (items moved, inventories changed, etc.)
+    def request_full_redraw(self):
+        self.full_redraw = True
+
+    # function to mark an area of the screen (pygame.Rect) to be redrawn on the next frame in dirty rectangle mode
+    # e.g. where text was drawn on top of the world after the last render
+    def mark_dirty(self, rect):
+        self.marked_rects.append(pygame.Rect(rect))
+
+    # function to get the screen rectangles of things that move without the camera moving
+    # (the orbiter and the item in hand), these are redrawn every frame in dirty rectangle mode
+    def get_moving_rects(self):
+        rects = []
+        if self.orbiter is not None:
+            rects.append(self.orbiter.get_rect(self.half_screen))
+        item_in_hand = self.player.item_in_hand
+        if item_in_hand is not None:
+            mouse_x, mouse_y = self.mouse_position
+            half_size = item_in_hand.image_scale / 2
+            rects.append(pygame.Rect(mouse_x - half_size, mouse_y - half_size, item_in_hand.image_scale, item_in_hand.image_scale))
+        return rects
 
+    # render the game world, returns a list of the screen rectangles that changed
+    # (pass these to pygame.display.update)
     def render(self, surface):
-        # Clear the screen by filling it with a solid color
-        surface.fill((0, 0, 0))  # Fill with black color
+        screen_rect = surface.get_rect()
+        # the camera is passed to everything drawn as a tuple of floats, so the per object math doesn't make numpy arrays
+        camera = self.camera_xy()
+        open_inventories = tuple(inventory.is_open for inventory in self.world_inventories) + (self.player_inventory.is_open,)
+        moving_rects = self.get_moving_rects()
+
+        # the whole screen needs to be drawn if dirty rectangles are off, the camera moved,
+        # an inventory was opened or closed, or something else asked for it
+        full_redraw = (not self.dirty_rect_mode or self.full_redraw or camera != self.last_camera
+                       or open_inventories != self.last_open_inventories)
+        if full_redraw:
+            dirty_rects = [screen_rect]
+        else:
+            # only redraw where the moving things were last frame and where they are now,
+            # plus anything marked dirty since the last frame
+            dirty_rects = []
+            for rect in self.last_moving_rects + moving_rects + self.marked_rects:
+                rect = rect.clip(screen_rect)
+                if rect.width > 0 and rect.height > 0:
+                    dirty_rects.append(rect)
+            # merge overlapping rectangles so no area is drawn twice
+            merged = []
+            for rect in dirty_rects:
+                index = rect.collidelist(merged)
+                while index != -1:
+                    rect = rect.union(merged.pop(index))
+                    index = rect.collidelist(merged)
+                merged.append(rect)
+            dirty_rects = merged
+
+        for rect in dirty_rects:
+            # draw everything that touches the rectangle, clipped to the rectangle
+            surface.set_clip(rect)
+            self.render_area(surface, rect, camera)
+        surface.set_clip(None)
+
+        self.full_redraw = False
+        self.marked_rects = []
+        self.last_camera = camera
+        self.last_open_inventories = open_inventories
+        self.last_moving_rects = moving_rects
+        return dirty_rects
+
+    # render everything that touches an area of the screen (pygame.Rect)
+    # if there is a profiler, the time spent on each layer is added to its phase
+    def render_area(self, surface, area, camera_position):
+        profiler = self.profiler
+        # Clear the area by filling it with a solid color
+        surface.fill((0, 0, 0), area)  # Fill with black color
 
         # Render the player on the given surface
-        self.player.render(surface, screen_size)
-
-        # first we want to make sure to only render what is visible on the screen
-        camera_position = self.get_camera_position()
-        # render the barriers
-        for barrier in self.barriers:
-            if self.check_if_on_screen(barrier.position):
-                barrier.render(surface, camera_position)
+        self.player.render(surface, self.screen_size)
+        if profiler is not None:
+            profiler.lap("background")
+
+        # first we want to make sure to only render what is visible in the area
+        # the spatial index gives everything in the cells under the area,
+        # anything partly outside the area gets clipped by pygame when drawn
+        map_x = camera_position[0] + area.x
+        map_y = camera_position[1] + area.y
+        # render the barriers, using the pre-baked chunk surfaces under the area
+        if self.bake_barriers:
+            self.barrier_chunks.render(surface, camera_position, (map_x, map_y, area.width, area.height))
+        else:
+            self.barriers.render(surface, camera_position, (map_x, map_y, area.width, area.height))
+        if profiler is not None:
+            profiler.lap("barriers")
 
         # render the entities
-        for entity in self.entities:
-            if self.check_if_on_screen(entity.position, entity.width, entity.height):
-                entity.render(surface, camera_position)
+        for entity in self.entity_grid.query(map_x, map_y, area.width, area.height):
+            entity.render(surface, camera_position)
+        if profiler is not None:
+            profiler.lap("entities")
 
-        # Render the orbiting object
-        orbiter.render(screen, screen_center)
+        # Render the orbiting object around the center of the screen (where the player is drawn)
+        if self.orbiter is not None:
+            self.orbiter.render(surface, self.half_screen)
+        if profiler is not None:
+            profiler.lap("background")
 
         # Render the items on the map
-        for item in self.items:
+        for item in self.item_grid.query(map_x, map_y, area.width, area.height):
             # if its in hand don't render it
             if item.in_hand:
                 continue
-            # if it's not in and inventory and it's on the screen, render it
-            elif not item.in_inventory and self.check_if_on_screen(item.map_position, item.width, item.height):
+            # if it's not in and inventory, render it
+            elif not item.in_inventory:
                 item.render_on_map(surface, camera_position)
+        if profiler is not None:
+            profiler.lap("items")
 
         # Render any other open inventories
         for inventory in self.world_inventories:
@@ -334,162 +667,322 @@ class GameWorld:
         # Render the player inventory
         if self.player_inventory.is_open:
             self.player_inventory.render(surface)
+        if profiler is not None:
+            profiler.lap("inventories")
 
         # Render the item in hand, after rendering the inventory so it is on top
-        item_in_hand = player.item_in_hand
+        item_in_hand = self.player.item_in_hand
         if item_in_hand is not None:
-            item_in_hand.render_on_screen(surface, pygame.mouse.get_pos(), True)
-
-
-# Set the window size and create a window
-screen_size = np.array([800, 800])
-screen_center = screen_size / 2
-screen_center_x = screen_center[0]
-screen_center_y = screen_center[1]
-
-# initialize player at center of screen
-player_position = screen_center.copy()
-player_velocity = np.array([0.0, 0.0])
-player_color = (190, 25, 190)
-player_max_velocity = 5.0
-player = Player(player_position, player_velocity, player_max_velocity, 10, player_color, None)
-
-# initialize 100 barriers at random positions
-num_barriers = 100
-bar_max_x = 1000
-bar_max_y = 1000
-barriers = [Barrier(np.array([random.random()*bar_max_x, random.random()*bar_max_y]), 20, 1, (105, 190, 0)) for _ in range(num_barriers)]
-#     def __init__(self, position, size, shape, color):
-
-# initialize 10 red barriers on top side of map
-red_barriers = [Barrier(np.array([i*100, 0]), 20, 1, (255, 0, 0)) for i in range(10)]
-# add the red barriers to barriers list
-barriers.extend(red_barriers)
-
-# initialize player inventory
-inventory_x_slots = 5
-inventory_y_slots = 2
-empty_inventory = np.empty((inventory_x_slots, inventory_y_slots), dtype=object)
-# use the new PlayerInventory class: PlayerInventory(ObjectInventory)
-#     def __init__(self, screen_size, contents, player):
-#         super().__init__(screen_size, contents, False, (0, 0), player)
-player_inventory = PlayerInventory(screen_size, empty_inventory, player)
-
-# currently, adding items to the inventory at the start of the game
-# does not work, so we will add them to the game world instead
-# (items are by default created not in hand)
-starting_items = []
-# in_inventory = False, map_position = rand_x, rand_y both in range(0, 500)
-first_item = create_rand_item(False, (50, 50), player)
-starting_items.append(first_item)
-# new_item = create_rand_item(False, (random.randint(0, 500), random.randint(0, 500)), player)
-# starting_items.append(new_item)
-
-# create some items on the map
-for i in range(10):
-    new_item = create_rand_item(False, (random.randint(0, 500), random.randint(0, 500)), player)
-    starting_items.append(new_item)
-
-# initialize game world inventories
-start_world_inventories = []
-
-# first test inventory using the class for objects with an inventory
-# class ObjectInventory:
-#     def __init__(self, screen_size, contents, is_open, map_position, player):
-entity_position = np.array([100, 100])
-test_inventory_x_slots = 1
-test_inventory_y_slots = 1
-empty_test_contents = np.empty((test_inventory_x_slots, test_inventory_y_slots), dtype=object)
-test_inventory1 = ObjectInventory(screen_size, empty_test_contents.copy(), False, entity_position, player)
-start_world_inventories.append(test_inventory1)
-
-# make an entity to have the inventory using:
-# class EntityWithInventory:
-#     def __init__(self, image, position, inventory):
-image_path = path = os.path.join('images', 'objects', 'smelter', 'furnace.png')
-image = pygame.image.load(image_path)
-test_entity1 = EntityWithInventory(image, entity_position, test_inventory1)
-
-# second test inventory using the class for objects with an inventory
-entity_position = np.array([500, 100])
-test_inventory2 = ObjectInventory(screen_size, empty_test_contents.copy(), False, entity_position, player)
-start_world_inventories.append(test_inventory2)
-
-# make an entity to have the inventory
-test_entity2 = EntityWithInventory(image, entity_position, test_inventory2)
-
-
-# initialize game stats
-map_dim = [900, 900]  # not used yet
-game_stats = GameStats(screen_size, map_dim)
-
-entities = [test_entity1, test_entity2]
-
-# Initialize the game world with the player and entities
-game_world = GameWorld(game_stats, player, entities, barriers, player_inventory, start_world_inventories, starting_items)
-
-
-# initialize an orbiting object around the player
-orbiter = Orbiter(10, 50, 0.1, (0, 50, 255))
-
-# Initialize Pygame
-pygame.init()
-
-# Create a window
-screen = pygame.display.set_mode(screen_size)
-
-# Set the window title
-pygame.display.set_caption("Game World")
-
-# initial settings
-mouse_button_released = True
-drawing = False # for drawing barriers with mouse
-frame_counter = 0
-start_time = time.time()
-current_time = start_time
-current_frame = 0
-update_print_rate = 1000 # how often to print the updates, in frames
-
-# Create a clock object to control the frame rate
-clock = pygame.time.Clock()
-
-while True:  # Run the game loop
-    frame_counter += 1
-
-    # Limit the frame rate
-    clock.tick(80)
-    # Calculate the FPS
-    fps = clock.get_fps()
-
-    # print some info
-    if not frame_counter % update_print_rate:
-        # print some info about the game
-        print("Player position: ", player.position)
-        print("Frame: ", frame_counter)
-        # print("Number of barriers: ", len(game_world.barriers))
-        print("Time elapsed: ", time.time() - start_time, "seconds")
-        if current_time - start_time > 0.5:
-            print("Current FPS: ", (frame_counter - current_frame) / (time.time() - current_time))
-        current_time = time.time()
-        current_frame = frame_counter
-        pass
-
-    game_world.render(screen)  # screen is a pygame surface
-    game_world.update()
-
-    # Display the FPS on the screen
-    fps_text = "FPS: {:.2f}".format(fps)
-    font = pygame.font.SysFont("Arial", 20)
-    text = font.render(fps_text, True, (155, 155, 255))
-    screen.blit(text, (10, 10))
+            item_in_hand.render_on_screen(surface, self.mouse_position, True)
+        if profiler is not None:
+            profiler.lap("held_item")
+
+
+# settings of a new game world, create_world and load_game_world both use these so they can't drift apart
+MAP_SIZE = [900, 900]  # pixels, not used yet
+PLAYER_MAX_VELOCITY = 5.0
+PLAYER_SIZE = 10  # pixels
+PLAYER_COLOR = (190, 25, 190)
+PLAYER_INVENTORY_SLOTS = (5, 2)  # x by y
+
+
+# function to make the object orbiting the player
+def create_orbiter():
+    return Orbiter(10, 50, 0.1, (0, 50, 255))
+
+
+# function to put a game world together from its parts
+# the parts that aren't saved (game stats and the orbiter) are made here, the same for new and loaded worlds
+def assemble_world(screen_size, player, entities, barriers, player_inventory, items):
+    game_stats = GameStats(screen_size, MAP_SIZE)
+    world_inventories = [entity.inventory for entity in entities]
+    return GameWorld(game_stats, player, entities, barriers, player_inventory, world_inventories, items, create_orbiter())
+
+
+# function to load a game world from a save folder made by GameWorld.save
+# the barriers use the memory-mapped arrays from the save directly, only items and entities are made into objects
+def load_game_world(directory, screen_size):
+    header, arrays = load_world(directory)
+    saved_player = header["player"]
+    player = Player(np.array(saved_player["position"], dtype=np.float64), np.array(saved_player["velocity"], dtype=np.float64),
+                    saved_player["max_velocity"], saved_player["size"], tuple(saved_player["color"]), None)
+    if saved_player["item_in_hand"] >= 0:
+        player.item_in_hand = Item(item_types[saved_player["item_in_hand"]], False, np.array([0.0, 0.0]), (0, 0), True)
+
+    barriers = BarrierField.from_arrays(arrays["barrier_positions"], arrays["barrier_sizes"], arrays["barrier_shapes"],
+                                        arrays["barrier_colors"])
+    entities, items = decode_entities(arrays, screen_size, player)
+    player_inventory = PlayerInventory(screen_size, np.empty(arrays["player_inventory"].shape, dtype=object), player)
+    player_inventory.is_open = header["player_inventory_open"]
+    items.extend(decode_inventory(arrays["player_inventory"], player_inventory))
+    if player.item_in_hand is not None:
+        items.append(player.item_in_hand)
+
+    world = assemble_world(screen_size, player, entities, barriers, player_inventory, items)
+    # the map items are added all at once, their positions are already in one array
+    world.add_items(decode_items(arrays), arrays["item_positions"])
+    return world
+
+
+# function to make the starting game world
+# seed is the random seed used for everything random in it, so the same seed always makes the same world
+# screen_size is the window size (pixels, numpy array), the player starts in the middle of it
+def create_world(seed, screen_size):
+    random.seed(seed)
+    np.random.seed(seed)
+
+    # initialize player at center of screen
+    player_position = screen_size / 2
+    player_velocity = np.array([0.0, 0.0])
+    player = Player(player_position, player_velocity, PLAYER_MAX_VELOCITY, PLAYER_SIZE, PLAYER_COLOR, None)
+
+    # initialize 100 barriers at random positions
+    num_barriers = 100
+    bar_max_x = 1000
+    bar_max_y = 1000
+    barriers = [Barrier(np.array([random.random()*bar_max_x, random.random()*bar_max_y]), 20, 1, (105, 190, 0)) for _ in range(num_barriers)]
+    #     def __init__(self, position, size, shape, color):
+
+    # initialize 10 red barriers on top side of map
+    red_barriers = [Barrier(np.array([i*100, 0]), 20, 1, (255, 0, 0)) for i in range(10)]
+    # add the red barriers to barriers list
+    barriers.extend(red_barriers)
+
+    # initialize player inventory
+    empty_inventory = np.empty(PLAYER_INVENTORY_SLOTS, dtype=object)
+    # use the new PlayerInventory class: PlayerInventory(ObjectInventory)
+    #     def __init__(self, screen_size, contents, player):
+    #         super().__init__(screen_size, contents, False, (0, 0), player)
+    player_inventory = PlayerInventory(screen_size, empty_inventory, player)
+
+    # currently, adding items to the inventory at the start of the game
+    # does not work, so we will add them to the game world instead
+    # (items are by default created not in hand)
+    starting_items = []
+    # in_inventory = False, map_position = rand_x, rand_y both in range(0, 500)
+    first_item = create_rand_item(False, (50, 50), player)
+    starting_items.append(first_item)
+    # new_item = create_rand_item(False, (random.randint(0, 500), random.randint(0, 500)), player)
+    # starting_items.append(new_item)
+
+    # create some items on the map, spread over the area from (0, 0) to (500, 500)
+    starting_items.extend(spawn_items(10, (0, 0, 500, 500), rng=np.random.default_rng(seed)))
+
+    # first test inventory using the class for objects with an inventory
+    # class ObjectInventory:
+    #     def __init__(self, screen_size, contents, is_open, map_position, player):
+    entity_position = np.array([100, 100])
+    test_inventory_x_slots = 1
+    test_inventory_y_slots = 1
+    empty_test_contents = np.empty((test_inventory_x_slots, test_inventory_y_slots), dtype=object)
+    test_inventory1 = ObjectInventory(screen_size, empty_test_contents.copy(), False, entity_position, player)
+
+    # make an entity to have the inventory using:
+    # class CraftingEntity(EntityWithInventory):
+    #     def __init__(self, image, position, inventory, can_craft=True):
+    # it is a furnace, so it crafts (e.g. put a stone in it to make a statue, see crafting.py for the recipes)
+    image_path = path = os.path.join('images', 'objects', 'smelter', 'furnace.png')
+    image = assets.load(image_path)
+    test_entity1 = CraftingEntity(image, entity_position, test_inventory1)
+
+    # second test inventory using the class for objects with an inventory
+    entity_position = np.array([500, 100])
+    test_inventory2 = ObjectInventory(screen_size, empty_test_contents.copy(), False, entity_position, player)
+
+    # make an entity to have the inventory
+    test_entity2 = EntityWithInventory(image, entity_position, test_inventory2)
+
+
+    entities = [test_entity1, test_entity2]
+
+    # Initialize the game world with the player and entities (the entities' inventories are the world inventories)
+    return assemble_world(screen_size, player, entities, barriers, player_inventory, starting_items)
+
+
+# Define the loop state class
+# things the main loop and the event handling keep track of between frames, that aren't part of the game world
+class LoopState:
+    def __init__(self, world, profiler, screen, simulation_process=False):
+        self.world = world  # game world being played, can be replaced by loading a save
+        self.screen = screen  # window surface the game is drawn on
+        self.profiler = profiler  # FrameProfiler timing each phase of each frame
+        self.frame_counter = 0
+        self.fps = 0.0  # frames per second shown on the screen
+        self.mouse_button_released = True
+        self.save_directory = os.path.join("saves", "quicksave")  # where F5 saves to and F9 loads from
+        self.simulation_process = simulation_process  # True to move the player in a worker process (see simulation.py)
+
+        # text drawn on top of the game world
+        self.hud = Hud("Arial", 20, (155, 155, 255))
+        self.hud.add_label("fps", (10, 10))
+        # F3 shows the profiler's breakdown on screen and F4 writes the kept frames to files
+        self.profile_hud = Hud("Arial", 16, (255, 255, 0))
+        self.profile_hud.visible = False
+        for line_number in range(len(profiler.overlay_lines())):
+            self.profile_hud.add_label(line_number, (10, 40 + 18 * line_number))
+
+
+# function to set up a game world for playing (dirty rectangles, streaming, the profiler and the simulation worker)
+def setup_world(world, profiler, simulation_process=False):
+    # only redraw the parts of the screen that change while the camera is still
+    world.dirty_rect_mode = True
+    # keep only the map near the player loaded, far away chunks are put in a temporary folder on disk
+    world.streamer = WorldStreamer(world)
+    world.profiler = profiler
+    if simulation_process:
+        # multiprocessing is only imported when the worker is used
+        from simulation import SimulationProcess
+        world.simulation = SimulationProcess(world.player, world.orbiter)
+
+
+# function to handle one keyboard or mouse event, returns False if the game should quit
+def handle_event(event, state):
+    game_world = state.world
+    player = game_world.player
+    if event.type == pygame.QUIT:
+        return False
+    elif event.type == pygame.MOUSEMOTION:
+        # the game world keeps the mouse position, so replays don't depend on the real mouse
+        game_world.mouse_position = event.pos
+    elif event.type == pygame.MOUSEBUTTONUP:
+        game_world.mouse_position = event.pos
+        # run the game world event that handles mouse button up
+        game_world.mouse_button_up(event)
+
+    elif event.type == pygame.MOUSEBUTTONDOWN:
+        # Set the mouse_button_released variable to False
+        state.mouse_button_released = False
+
+        # Get the mouse position
+        game_world.mouse_position = event.pos
+        mouse_x, mouse_y = event.pos
+        print(f"Mouse clicked at position ({mouse_x}, {mouse_y})")
+
+        game_world.mouse_button_down(event)
+
+    # Keyboard press events for: player movement, inventory, and game world
+    if event.type == pygame.KEYDOWN:
+        # print some stats if "b" is pressed
+        if event.key == pygame.K_b:
+            # print the player inventory
+            print("Player inventory: ", game_world.player_inventory.contents)
+            # print items in player hand
+            print("Items in player hand: ", game_world.player.item_in_hand)
+            # mouse position
+            mouse_x, mouse_y = game_world.mouse_position
+            print(f"Mouse position ({mouse_x}, {mouse_y})")
+
+        # show or hide the profiler breakdown if F3 is pressed
+        if event.key == pygame.K_F3:
+            state.profile_hud.visible = not state.profile_hud.visible
+            game_world.request_full_redraw()
+        # write the profiler's kept frames to CSV and JSON files if F4 is pressed
+        if event.key == pygame.K_F4:
+            print("Wrote frame profile to", state.profiler.dump())
+
+        # save the world if F5 is pressed
+        if event.key == pygame.K_F5:
+            try:
+                game_world.save(state.save_directory)
+                print("Saved to", state.save_directory)
+            except ValueError as error:
+                print("Couldn't save:", error)
+        # load the last save if F9 is pressed
+        if event.key == pygame.K_F9 and os.path.exists(os.path.join(state.save_directory, "header.json")):
+            game_world.close()
+            mouse_position = game_world.mouse_position
+            game_world = state.world = load_game_world(state.save_directory, game_world.screen_size)
+            game_world.mouse_position = mouse_position
+            setup_world(game_world, state.profiler, state.simulation_process)
+            player = game_world.player
+            print("Loaded", state.save_directory)
+
+        # if "v" is pressed, open the test entity inventory
+        if event.key == pygame.K_v:
+            for entity in game_world.entities:
+                if entity.inventory:
+                    entity.inventory.is_open = not entity.inventory.is_open
+            print("Test inventory is open")
+        # Open the player inventory if the E key is pressed
+        if event.key == pygame.K_e:
+            # Open the player inventory if it is not already open
+            game_world.player_inventory.is_open = not game_world.player_inventory.is_open
+
+        velocity = player.max_velocity # for testing
+        if event.key == pygame.K_w:
+            player.velocity[1] = -velocity  # Move player up
+        elif event.key == pygame.K_a:
+            player.velocity[0] = -velocity  # Move player left
+        elif event.key == pygame.K_s:
+            player.velocity[1] = velocity  # Move player down
+        elif event.key == pygame.K_d:
+            player.velocity[0] = velocity  # Move player right
+        # make sure the player doesn't move faster than their max velocity
+        # print something if velocity in any direction is greater than max velocity
+        if player.velocity[0] > player.max_velocity or player.velocity[0] < -player.max_velocity or player.velocity[1] > player.max_velocity or player.velocity[1] < -player.max_velocity:
+            # print("Player is moving too fast!")
+            pass
+
+        # if the space bar is pressed reduce the player's velocity by 1/4
+        if event.key == pygame.K_SPACE:
+            player.velocity = player.velocity / 4
+            pass
+
+    elif event.type == pygame.KEYUP:
+
+        if event.key == pygame.K_w or event.key == pygame.K_s:
+            player.velocity[1] = 0  # Stop moving player vertically
+        elif event.key == pygame.K_a or event.key == pygame.K_d:
+            player.velocity[0] = 0  # Stop moving player horizontally
+    return True
+
+
+# function to run one frame: steps updates, drawing (if alpha isn't None) and the frame's events
+# alpha is how far (0 to 1) between the last two updates to draw things, returns False if the game should quit
+# draw=False puts the camera where alpha says without drawing anything (replays without rendering)
+def run_frame(state, steps, events, alpha, draw=True):
+    game_world = state.world
+    profiler = state.profiler
+    screen = state.screen
+    state.frame_counter += 1
+    frame_counter = state.frame_counter
+
+    profiler.begin_frame()
+    # swap in the images that finished loading in the background
+    if assets.poll():
+        game_world.refresh_images()
+    # update the game for each fixed step of time that has passed
+    for _ in range(steps):
+        game_world.update()
+    profiler.lap("update")
+
+    dirty_rects = []
+    # clicks are mapped with the camera, so it has to follow the player even on frames that aren't drawn
+    game_world.interpolate(alpha if alpha is not None else 1.0)
+    draw = draw and alpha is not None
+    if draw:
+        # draw things part way between the last two updates, so movement is smooth at any frame rate
+        dirty_rects = game_world.render(screen)  # screen is a pygame surface, returns the rects that changed
+
+        # Display the FPS on the screen
+        state.hud.set_text("fps", "FPS: {:.2f}".format(state.fps))
+        # the profiler breakdown is only updated a few times a second so it can be read
+        if state.profile_hud.visible and not frame_counter % 20:
+            for line_number, line in enumerate(profiler.overlay_lines()):
+                state.profile_hud.set_text(line_number, line)
+        # the text is drawn on top of the world, so it needs to be updated now and cleared on the next frame
+        for text_rect in state.hud.render(screen) + state.profile_hud.render(screen):
+            dirty_rects.append(text_rect)
+            game_world.mark_dirty(text_rect)
+        profiler.lap("hud")
 
     # Events for if the mouse button is being pressed
-    if not mouse_button_released:
+    if not state.mouse_button_released:
         # Drawing on the screen with barriers if drawing is True
-        if game_stats.drawing:
+        if game_world.game_stats.drawing:
             # add a barrier to mouse position
-            mouse_x, mouse_y = pygame.mouse.get_pos()
-            rel_mouse_pos = np.array([mouse_x, mouse_y]) + game_world.player.position - np.array(screen_size) / 2
+            mouse_x, mouse_y = game_world.mouse_position
+            rel_mouse_pos = game_world.screen_to_map((mouse_x, mouse_y))
             # non random color
             # color = (105, 190, 0)
             # random color
@@ -505,73 +998,10 @@ while True:  # Run the game loop
             game_world.create_barrier(rel_mouse_pos, 20, 1, color)
 
     # check keyboard and mouse events
-    for event in pygame.event.get():  # Check for player input
-        if event.type == pygame.QUIT:
-            pygame.quit()
-            sys.exit()
-        elif event.type == pygame.MOUSEBUTTONUP:
-            # run the game world event that handles mouse button up
-            game_world.mouse_button_up(event)
-
-        elif event.type == pygame.MOUSEBUTTONDOWN:
-            # Set the mouse_button_released variable to False
-            mouse_button_released = False
-
-            # Get the mouse position
-            mouse_x, mouse_y = pygame.mouse.get_pos()
-            print(f"Mouse clicked at position ({mouse_x}, {mouse_y})")
-
-            game_world.mouse_button_down(event)
-
-        # Keyboard press events for: player movement, inventory, and game world
-        if event.type == pygame.KEYDOWN:
-            # print some stats if "b" is pressed
-            if event.key == pygame.K_b:
-                # print the player inventory
-                print("Player inventory: ", game_world.player_inventory.contents)
-                # print items in player hand
-                print("Items in player hand: ", game_world.player.item_in_hand)
-                # mouse position
-                mouse_x, mouse_y = pygame.mouse.get_pos()
-                print(f"Mouse position ({mouse_x}, {mouse_y})")
-
-            # if "v" is pressed, open the test entity inventory
-            if event.key == pygame.K_v:
-                for entity in game_world.entities:
-                    if entity.inventory:
-                        entity.inventory.is_open = not entity.inventory.is_open
-                print("Test inventory is open")
-            # Open the player inventory if the E key is pressed
-            if event.key == pygame.K_e:
-                # Open the player inventory if it is not already open
-                game_world.player_inventory.is_open = not game_world.player_inventory.is_open
-
-            velocity = player.max_velocity # for testing
-            if event.key == pygame.K_w:
-                player.velocity[1] = -velocity  # Move player up
-            elif event.key == pygame.K_a:
-                player.velocity[0] = -velocity  # Move player left
-            elif event.key == pygame.K_s:
-                player.velocity[1] = velocity  # Move player down
-            elif event.key == pygame.K_d:
-                player.velocity[0] = velocity  # Move player right
-            # make sure the player doesn't move faster than their max velocity
-            # print something if velocity in any direction is greater than max velocity
-            if player.velocity[0] > player.max_velocity or player.velocity[0] < -player.max_velocity or player.velocity[1] > player.max_velocity or player.velocity[1] < -player.max_velocity:
-                # print("Player is moving too fast!")
-                pass
-
-            # if the space bar is pressed reduce the player's velocity by 1/4
-            if event.key == pygame.K_SPACE:
-                player.velocity = player.velocity / 4
-                pass
-
-        elif event.type == pygame.KEYUP:
-
-            if event.key == pygame.K_w or event.key == pygame.K_s:
-                player.velocity[1] = 0  # Stop moving player vertically
-            elif event.key == pygame.K_a or event.key == pygame.K_d:
-                player.velocity[0] = 0  # Stop moving player horizontally
+    running = True
+    for event in events:  # Check for player input
+        if not handle_event(event, state):
+            running = False
 
     # scroll the screen to the player's position
     # camera_x = -player.position[0] + screen_center[0]
@@ -579,6 +1009,187 @@ while True:  # Run the game loop
     # screen.scroll(int(camera_x), int(camera_y))
     # screen.blit(screen, (camera_x, camera_y))
 
-    # update the screen
-    pygame.display.update()
-
+    profiler.lap("events")
+
+    # update the parts of the screen that changed
+    if draw:
+        pygame.display.update(dirty_rects)
+    profiler.lap("display")
+    profiler.end_frame()
+    return running
+
+
+# Define the game config class
+# the settings create_game starts the game with, the defaults are the normal game
+class GameConfig:
+    def __init__(self, screen_size=(800, 800), seed=None, record_path=None, simulation_process=False,
+                 async_assets=True, use_atlas=True, startup_profile=False):
+        self.screen_size = np.array(screen_size)  # window size (pixels)
+        # random seed for the starting world, it is saved with recorded input so a session can be replayed
+        self.seed = seed if seed is not None else random.randrange(2 ** 32)
+        self.record_path = record_path  # file to record the input to (see replay.py), None to not record
+        self.simulation_process = simulation_process  # True to move the player in a worker process (see simulation.py)
+        self.async_assets = async_assets  # True to decode images in the background behind placeholders
+        self.use_atlas = use_atlas  # True to draw item and entity sprites from the texture atlas
+        self.startup_profile = startup_profile  # True to print how long each part of starting up took
+
+
+# Define the game class
+# what create_game sets up: the window, the loop state (which holds the game world) and the startup timings
+class Game:
+    def __init__(self, config, screen, state, startup):
+        self.config = config
+        self.screen = screen
+        self.state = state
+        self.startup = startup  # StartupTimer with the time each part of starting up took
+
+    @property
+    def world(self):
+        return self.state.world
+
+
+# function to start the game: pygame, the window, the assets and the starting world, returns a Game
+# nothing is done when main.py is imported, so the game classes can be used (e.g. by benchmark.py) without a window
+# startup is a StartupTimer to add the timings to, e.g. one that has already timed the imports
+def create_game(config, startup=None):
+    if startup is None:
+        startup = StartupTimer()
+
+    # Initialize Pygame
+    pygame.init()
+    startup.lap("pygame init")
+
+    # Create a window
+    # this is done before loading any images so they can be converted to the display's pixel format
+    screen = pygame.display.set_mode(config.screen_size)
+    # Set the window title
+    pygame.display.set_caption("Game World")
+    startup.lap("window")
+
+    # decode images on background threads, the game starts with placeholders that are filled in as images finish
+    if config.async_assets:
+        assets.start_async()
+    # start loading all item images up front, so creating items does no file I/O
+    assets.preload_items()
+    startup.lap("assets")
+    # item and entity sprites are drawn from the texture atlas (built into images/atlas the first time)
+    if config.use_atlas:
+        atlas.load_or_build()
+    startup.lap("atlas")
+
+    world = create_world(config.seed, config.screen_size)
+    startup.lap("world build")
+
+    # time each phase of every frame
+    profiler = FrameProfiler()
+    setup_world(world, profiler, config.simulation_process)
+    state = LoopState(world, profiler, screen, config.simulation_process)
+    startup.lap("subsystems")
+    return Game(config, screen, state, startup)
+
+
+# run the game loop, this is only called when main.py is run directly
+# config is a GameConfig, startup is a StartupTimer that has timed the imports (or None)
+def main(config, startup=None):
+    if config.record_path and config.simulation_process:
+        # the worker runs steps on its own time, so the session couldn't be played back the same
+        raise ValueError("sessions with the simulation process can't be recorded")
+    game = create_game(config, startup)
+    state = game.state
+
+    # initial settings
+    start_time = time.time()
+    current_time = start_time
+    current_frame = 0
+    update_print_rate = 1000 # how often to print the updates, in frames
+
+    # Create a clock object to control the frame rate
+    clock = pygame.time.Clock()
+    # the game is updated 80 times a second no matter the frame rate,
+    # several updates can run for one frame, or rendering can be skipped to catch up
+    step_rate = 80
+    timestep = FixedTimestep(step_rate)
+    recorder = None
+    if config.record_path:
+        from recording import InputRecorder
+        recorder = InputRecorder(config.seed, step_rate)
+
+    running = True
+    first_frame = True
+    while running:  # Run the game loop
+        # Limit the frame rate
+        clock.tick(80)
+        # Calculate the FPS
+        state.fps = clock.get_fps()
+
+        # print some info
+        frame_counter = state.frame_counter + 1
+        if not frame_counter % update_print_rate:
+            # print some info about the game
+            print("Player position: ", state.world.player.position)
+            print("Frame: ", frame_counter)
+            # print("Number of barriers: ", len(game_world.barriers))
+            print("Time elapsed: ", time.time() - start_time, "seconds")
+            if current_time - start_time > 0.5:
+                print("Current FPS: ", (frame_counter - current_frame) / (time.time() - current_time))
+            # scaled sprite cache counters, misses should stop going up once everything on screen has been drawn once
+            print("Sprite cache: ", scaled_cache.stats())
+            current_time = time.time()
+            current_frame = frame_counter
+            pass
+
+        steps = timestep.advance()
+        alpha = timestep.alpha() if timestep.should_render() else None
+        events = pygame.event.get()
+        if recorder is not None:
+            recorder.record_frame(steps, events, alpha)
+        running = run_frame(state, steps, events, alpha)
+
+        if first_frame and alpha is not None:
+            # the first frame is on the screen, so starting up is done
+            first_frame = False
+            game.startup.lap("first frame")
+            if config.startup_profile:
+                for line in game.startup.report_lines():
+                    print(line)
+
+    if recorder is not None:
+        recorder.save(config.record_path)
+        print("Recorded input to", config.record_path)
+    state.world.close()
+    pygame.quit()
+    sys.exit()
+
+
+# function to play back a recording (recording.Recording) made with main.py --record, as fast as possible
+# the starting world is made again from the recorded seed, and each frame runs the recorded number of updates
+# and events with the camera where it was. if render is False nothing is drawn,
+# returns the LoopState at the end (its profiler has the frame times)
+def replay(recording, render=True):
+    game = create_game(GameConfig(seed=recording.seed))
+    state = game.state
+    state.profiler = state.world.profiler = FrameProfiler(capacity=max(1, len(recording)))
+    for steps, events, alpha in recording:
+        if not run_frame(state, steps, events, alpha, draw=render):
+            break
+    state.world.close()
+    return state
+
+
+if __name__ == "__main__":
+    startup = StartupTimer(IMPORT_START)
+    startup.lap("imports")
+    parser = argparse.ArgumentParser(description="Top-down RPG game")
+    parser.add_argument("--record", help="record the input to this file, so the session can be replayed with replay.py")
+    parser.add_argument("--simulation-process", action="store_true", help="move the player in a worker process")
+    parser.add_argument("--seed", type=int, help="random seed for the starting world (default: a random one)")
+    parser.add_argument("--sync-assets", action="store_true", help="decode every image before the first frame")
+    parser.add_argument("--no-atlas", action="store_true", help="draw item and entity sprites from their own surfaces")
+    parser.add_argument("--startup-profile", action="store_true",
+                        help="print how long each part of starting up took, up to the first frame")
+    args = parser.parse_args()
+    if args.record and args.simulation_process:
+        parser.error("--record can't be used with --simulation-process")
+    main(GameConfig(seed=args.seed, record_path=args.record, simulation_process=args.simulation_process,
+                    async_assets=not args.sync_assets, use_atlas=not args.no_atlas, startup_profile=args.startup_profile),
+         startup)
@@ -0,0 +1,149 @@
+'''
+10/18/2026
+profiler.py
+Per-phase frame timings, kept for the last few hundred frames
+'''
+
+import os
+import csv
+import json
+import time
+import numpy as np
+
+
+# phases of a frame, in the order they happen
+PHASES = ["update", "background", "barriers", "entities", "items", "inventories", "held_item", "hud", "events", "display"]
+
+
+# Define the frame profiler class
+# each frame is split into phases, and the time spent in each phase is added up with lap().
+# the timings of the last capacity frames are kept in a ring buffer (a numpy array that is written over in a circle),
+# so the profiler can be left on for a whole session without using more memory
+class FrameProfiler:
+    def __init__(self, capacity=600, phases=PHASES):
+        self.phases = list(phases)
+        self.phase_index = {phase: index for index, phase in enumerate(self.phases)}
+        self.capacity = capacity  # number of frames kept
+        self.times = np.zeros((capacity, len(self.phases)))  # seconds spent in each phase, one row per frame
+        self.totals = np.zeros(capacity)  # seconds from the start to the end of each frame
+        self.frame_numbers = np.zeros(capacity, dtype=np.int64)  # frame number of each row
+        self.frame = 0  # number of frames recorded
+        self.current = np.zeros(len(self.phases))  # times of the frame being recorded
+        self.frame_start = None  # time the frame being recorded started
+        self.last_lap = None  # time of the last lap
+
+    # function to start recording a frame
+    def begin_frame(self):
+        self.current[:] = 0
+        self.frame_start = self.last_lap = time.perf_counter()
+
+    # function to add the time since the last lap (or the start of the frame) to a phase
+    # call this at the end of each phase, a phase can be lapped more than once in a frame and the times are added
+    def lap(self, phase):
+        now = time.perf_counter()
+        self.current[self.phase_index[phase]] += now - self.last_lap
+        self.last_lap = now
+
+    # function to finish recording a frame and store its times in the ring buffer
+    def end_frame(self):
+        row = self.frame % self.capacity
+        self.times[row] = self.current
+        self.totals[row] = time.perf_counter() - self.frame_start
+        self.frame_numbers[row] = self.frame
+        self.frame += 1
+
+    # function to get the rows of the ring buffer for the last frames (oldest first), all kept frames if frames is None
+    def rows(self, frames=None):
+        count = min(self.frame, self.capacity)
+        if frames is not None:
+            count = min(count, frames)
+        return (self.frame - count + np.arange(count)) % self.capacity
+
+    # function to get the average milliseconds spent in each phase over the last frames, phase -> ms
+    def averages(self, frames=None):
+        rows = self.rows(frames)
+        if len(rows) == 0:
+            return {phase: 0.0 for phase in self.phases}
+        means = self.times[rows].mean(axis=0) * 1000
+        return dict(zip(self.phases, means.tolist()))
+
+    # function to get the milliseconds of the slowest frame out of the last frames, and what each phase took in it
+    # returns (frame number, total ms, phase -> ms), or None if no frames have been recorded
+    def worst(self, frames=None):
+        rows = self.rows(frames)
+        if len(rows) == 0:
+            return None
+        row = rows[np.argmax(self.totals[rows])]
+        phase_ms = dict(zip(self.phases, (self.times[row] * 1000).tolist()))
+        return int(self.frame_numbers[row]), float(self.totals[row] * 1000), phase_ms
+
+    # function to get the lines of text for the on screen breakdown
+    def overlay_lines(self, frames=60):
+        rows = self.rows(frames)
+        total = float(self.totals[rows].mean() * 1000) if len(rows) else 0.0
+        lines = ["frame {:6.2f} ms".format(total)]
+        for phase, ms in self.averages(frames).items():
+            lines.append("{:<11} {:6.2f} ms".format(phase, ms))
+        return lines
+
+    # function to get the kept frames as a list of dicts (oldest first), times in milliseconds
+    def records(self):
+        records = []
+        for row in self.rows().tolist():
+            record = {"frame": int(self.frame_numbers[row]), "total": float(self.totals[row] * 1000)}
+            record.update(zip(self.phases, (self.times[row] * 1000).tolist()))
+            records.append(record)
+        return records
+
+    # function to write the kept frames to a CSV file, one row per frame, times in milliseconds
+    def dump_csv(self, path):
+        with open(path, "w", newline="") as file:
+            writer = csv.DictWriter(file, fieldnames=["frame", "total"] + self.phases)
+            writer.writeheader()
+            writer.writerows(self.records())
+
+    # function to write the kept frames to a JSON file, times in milliseconds
+    def dump_json(self, path):
+        with open(path, "w") as file:
+            json.dump({"phases": self.phases, "frames": self.records()}, file)
+
+    # function to write the kept frames to both a CSV and a JSON file in a folder, returns the two paths
+    def dump(self, directory="profiles"):
+        os.makedirs(directory, exist_ok=True)
+        name = time.strftime("profile_%Y%m%d_%H%M%S")
+        csv_path = os.path.join(directory, name + ".csv")
+        json_path = os.path.join(directory, name + ".json")
+        self.dump_csv(csv_path)
+        self.dump_json(json_path)
+        return csv_path, json_path
+
+
+# Define the startup timer class
+# times each part of starting the game (imports, pygame init, assets, world build, first frame) with lap(),
+# the same way FrameProfiler times the phases of a frame
+class StartupTimer:
+    def __init__(self, start=None):
+        self.start = start if start is not None else time.perf_counter()  # time starting up began
+        self.last_lap = self.start  # time of the last lap
+        self.phases = []  # (phase, seconds) in the order they were lapped
+
+    # function to record the time since the last lap (or the start) as a phase
+    def lap(self, phase):
+        now = time.perf_counter()
+        self.phases.append((phase, now - self.last_lap))
+        self.last_lap = now
+
+    # seconds from the start to the last lap
+    def total(self):
+        return self.last_lap - self.start
+
+    # function to get the phases as a dict, phase -> milliseconds
+    def milliseconds(self):
+        return {phase: seconds * 1000 for phase, seconds in self.phases}
+
+    # function to get the lines of text for the startup report
+    def report_lines(self):
+        lines = ["startup {:8.1f} ms".format(self.total() * 1000)]
+        for phase, seconds in self.phases:
+            lines.append("  {:<12} {:8.1f} ms".format(phase, seconds * 1000))
+        return lines
@@ -0,0 +1,97 @@
+'''
+10/18/2026
+recording.py
+Recording the player's input (and the random seed of the world) to a file, and reading it back for replays
+'''
+
+import json
+import pygame
+
+
+# version of the recording file layout, increase this when the layout changes
+RECORDING_VERSION = 2
+
+# event types that the game handles, only these are recorded
+RECORDED_EVENTS = [pygame.QUIT, pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP, pygame.MOUSEMOTION, pygame.KEYDOWN, pygame.KEYUP]
+
+
+# function to turn an event's attributes into something that can be written to JSON
+# tuples (e.g. pos) become lists, attributes that can't be written (e.g. window) are left out
+def encode_event(event):
+    attributes = {}
+    for name, value in event.dict.items():
+        if isinstance(value, (bool, int, float, str)):
+            attributes[name] = value
+        elif isinstance(value, tuple):
+            attributes[name] = list(value)
+    return [pygame.event.event_name(event.type), attributes]
+
+
+# function to make an event back from encode_event's output
+def decode_event(encoded):
+    event_types = {pygame.event.event_name(event_type): event_type for event_type in RECORDED_EVENTS}
+    name, attributes = encoded
+    attributes = {key: tuple(value) if isinstance(value, list) else value for key, value in attributes.items()}
+    return pygame.event.Event(event_types[name], attributes)
+
+
+# Define the input recorder class
+# for every frame it keeps how many updates ran, where between the updates the camera was and which events arrived,
+# together with the world's seed that is enough to play the session again exactly
+class InputRecorder:
+    def __init__(self, seed, step_rate):
+        self.seed = seed  # random seed the starting world was made with
+        self.step_rate = step_rate  # updates per second the game was running at
+        self.steps = []  # number of updates run on each frame
+        self.alphas = []  # alpha each frame was drawn at, None for frames that weren't drawn
+        self.events = []  # [frame, encoded event] for each recorded event
+
+    # function to add a frame, events are the events handled on the frame
+    # alpha matters because clicks are mapped to the map with the camera, which is moved by alpha
+    def record_frame(self, steps, events, alpha):
+        frame = len(self.steps)
+        self.steps.append(steps)
+        self.alphas.append(alpha)
+        for event in events:
+            if event.type in RECORDED_EVENTS:
+                self.events.append([frame] + encode_event(event))
+
+    # function to write the recording to a JSON file
+    def save(self, path):
+        with open(path, "w") as file:
+            json.dump({"version": RECORDING_VERSION, "seed": self.seed, "step_rate": self.step_rate,
+                       "steps": self.steps, "alphas": self.alphas, "events": self.events}, file)
+
+
+# Define the recording class
+# a recording read back from a file, iterating over it gives (updates, events, alpha) for each frame in order
+class Recording:
+    def __init__(self, seed, step_rate, steps, events, alphas=None):
+        self.seed = seed
+        self.step_rate = step_rate
+        self.steps = steps
+        # recordings from before alphas were kept were played back with every frame drawn at 1
+        self.alphas = alphas if alphas is not None else [1.0] * len(steps)
+        self.events = events  # [frame, event name, attributes] in the order they arrived
+
+    def __len__(self):
+        return len(self.steps)
+
+    def __iter__(self):
+        next_event = 0
+        for frame, (steps, alpha) in enumerate(zip(self.steps, self.alphas)):
+            events = []
+            while next_event < len(self.events) and self.events[next_event][0] == frame:
+                events.append(decode_event(self.events[next_event][1:]))
+                next_event += 1
+            yield steps, events, alpha
+
+
+# function to read a recording written by InputRecorder.save
+def load_recording(path):
+    with open(path) as file:
+        data = json.load(file)
+    # version 1 is the same without the alphas
+    if data["version"] not in (1, RECORDING_VERSION):
+        raise ValueError("unsupported recording version: " + str(data["version"]))
+    return Recording(data["seed"], data["step_rate"], data["steps"], data["events"], data.get("alphas"))
@@ -0,0 +1,78 @@
+'''
+10/18/2026
+replay.py
+Plays back an input recording made with "python main.py --record FILE", headless and as fast as possible
+The world is made again from the recorded seed, and each frame runs the recorded number of updates and events
+through the same handlers as the game, so the session ends in the same state every time. Prints a JSON summary
+of the final state, which can be compared between runs or commits.
+
+example:
+    python main.py --record session.json
+    python replay.py session.json --no-render
+'''
+
+import sys
+import time
+import hashlib
+import argparse
+import contextlib
+
+# importing benchmark sets up the dummy drivers, it has to come before anything that imports pygame
+from benchmark import write_results
+
+import numpy as np
+
+from main import replay
+from recording import load_recording
+
+
+# function to get a short hash of where everything in the world is, two replays that end the same have the same hash
+def world_checksum(world):
+    digest = hashlib.sha1()
+    digest.update(np.asarray(world.player.position, dtype=np.float64).tobytes())
+    count = world.barriers.count
+    digest.update(np.ascontiguousarray(world.barriers.positions[:count], dtype=np.float64).tobytes())
+    for item in sorted(world.item_grid.objects, key=lambda item: (item.name, tuple(item.map_position))):
+        digest.update((item.name + repr(tuple(item.map_position))).encode())
+    for item, slot in sorted(world.player_inventory.item_slots.items(), key=lambda pair: pair[1]):
+        digest.update((item.name + repr(slot)).encode())
+    return digest.hexdigest()[:16]
+
+
+def run(args):
+    recording = load_recording(args.recording)
+    start = time.perf_counter()
+    # the game prints things when keys are pressed, keep them out of the JSON output
+    with contextlib.redirect_stdout(sys.stderr):
+        state = replay(recording, render=not args.no_render)
+    elapsed = time.perf_counter() - start
+    world = state.world
+    results = {
+        "recording": args.recording,
+        "seed": recording.seed,
+        "frames": state.frame_counter,
+        "updates": int(sum(recording.steps)),
+        "seconds": elapsed,
+        "player_position": [float(value) for value in world.player.position],
+        "barriers": int(world.barriers.count),
+        "map_items": len(world.item_grid.objects),
+        "checksum": world_checksum(world),
+    }
+    if args.profile:
+        results["phase_ms"] = state.profiler.averages()
+    return results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Headless replay of a recorded game session")
+    parser.add_argument("recording", help="recording file written by main.py --record")
+    parser.add_argument("--no-render", action="store_true", help="only run the updates and events, don't draw anything")
+    parser.add_argument("--profile", action="store_true", help="also report the average time of each phase of the frame")
+    parser.add_argument("--output", help="file to write the JSON results to (default: print them)")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    results = run(args)
+    write_results(results, args.output)
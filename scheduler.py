@@ -0,0 +1,87 @@
+'''
+10/18/2026
+scheduler.py
+Entity update scheduler, entities are only updated when they have something to do
+'''
+
+import heapq
+
+
+# Define the tick scheduler class
+# instead of updating every entity every tick, entities are woken up by timers kept in a priority queue.
+# an entity's update() returns how many ticks until it wants to be updated again, or None to sleep until
+# something wakes it (wake or wake_in). entities further than activity_radius from the player are not updated,
+# they are checked again every far_delay ticks until the player comes close
+# so each tick only costs as much as the entities that are due
+class TickScheduler:
+    def __init__(self, activity_radius=2000, far_delay=40):
+        self.activity_radius = activity_radius  # pixels, None to update entities anywhere on the map
+        self.far_delay = far_delay  # ticks to wait before checking a far away entity again
+        self.tick = 0  # number of ticks run
+        self.queue = []  # heap of (tick due, order added, entity)
+        self.due = {}  # entity -> (tick due, order added) of its entry in the queue that counts, old entries are skipped
+        self.counter = 0  # next order added, so entities due on the same tick are updated in the order they were woken
+        self.last_updates = 0  # number of entities updated on the last tick
+
+    # number of entities waiting to be updated (sleeping entities aren't counted)
+    def __len__(self):
+        return len(self.due)
+
+    # True if the entity is waiting to be updated
+    def __contains__(self, entity):
+        return entity in self.due
+
+    # function to add an entity, it is updated on the next tick
+    def add(self, entity):
+        self.wake_in(entity, 1)
+
+    # function to remove an entity, it won't be updated anymore
+    def remove(self, entity):
+        # the entry stays in the queue, it is skipped when it comes up
+        self.due.pop(entity, None)
+
+    # function to update an entity in ticks ticks (1 = the next tick)
+    # if the entity is already due sooner it is left as it is
+    def wake_in(self, entity, ticks):
+        due = self.tick + max(1, int(ticks))
+        entry = self.due.get(entity)
+        if entry is not None and entry[0] <= due:
+            return
+        self.due[entity] = (due, self.counter)
+        heapq.heappush(self.queue, (due, self.counter, entity))
+        self.counter += 1
+
+    # function to update an entity on the next tick, e.g. when something is put in its inventory
+    def wake(self, entity):
+        self.wake_in(entity, 1)
+
+    # function to check if an entity is close enough to the player to be updated
+    def is_active(self, entity, player_position):
+        if self.activity_radius is None:
+            return True
+        position = getattr(entity, "position", None)
+        if position is None:
+            return True
+        dx = position[0] - player_position[0]
+        dy = position[1] - player_position[1]
+        return dx * dx + dy * dy <= self.activity_radius * self.activity_radius
+
+    # function to run one tick, updating the entities that are due
+    def update(self, player_position):
+        self.tick += 1
+        queue = self.queue
+        updates = 0
+        while queue and queue[0][0] <= self.tick:
+            due, order, entity = heapq.heappop(queue)
+            if self.due.get(entity) != (due, order):
+                continue  # removed, or woken again for a different time
+            del self.due[entity]
+            if not self.is_active(entity, player_position):
+                # too far from the player, look again later
+                self.wake_in(entity, self.far_delay)
+                continue
+            updates += 1
+            ticks = entity.update()
+            if ticks is not None:
+                self.wake_in(entity, ticks)
+        self.last_updates = updates
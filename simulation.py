@@ -0,0 +1,204 @@
+'''
+10/18/2026
+simulation.py
+Optional worker process that runs the game's movement simulation on another core
+The worker and the game exchange numbers through shared memory (multiprocessing.shared_memory) viewed as numpy
+arrays, so nothing is pickled or sent through a pipe while the game is running.
+'''
+
+import time
+import multiprocessing
+from multiprocessing import shared_memory
+import numpy as np
+
+
+# values in each published snapshot, name -> number of float64s
+SNAPSHOT_FIELDS = {"position": 2, "previous_position": 2, "angle": 1, "previous_angle": 1}
+# values the game writes for each step it asks for, name -> number of float64s
+INPUT_FIELDS = {"velocity": 2, "orbiter_speed": 1}
+# number of steps the game can ask for ahead of the worker, the inputs of each are kept in a ring of this many rows
+INPUT_ROWS = 256
+
+# positions in the control array (int64)
+PUBLISHED = 0  # snapshot slot (0 or 1) with the latest finished step
+TARGET = 1  # number of steps the game has asked for, the worker steps until it has run this many
+RUNNING = 2  # 1 while the worker should keep going
+SLOT_SEQUENCE = 3  # sequence numbers of the two slots (3 and 4), odd while a slot is being written
+SLOT_TICK = 5  # step number each slot (5 and 6) holds
+CONTROL_SIZE = 7
+
+
+# function to get where each field starts and ends in a block of float64s
+def field_offsets(fields):
+    offsets = {}
+    start = 0
+    for name, size in fields.items():
+        offsets[name] = (start, start + size)
+        start += size
+    return offsets, start
+
+
+# Define the shared snapshot class
+# one block of shared memory holding a control array, a ring of inputs (one row per step asked for)
+# and two snapshot slots (double buffering).
+# the worker always writes the slot that isn't published and then publishes it, so the game reads a whole
+# finished step without waiting for the worker. each slot has a sequence number that is odd while it is being
+# written, the reader copies a slot and tries again if the number changed (a seqlock), so a slow reader can never
+# see half of one step and half of the next
+class SharedSnapshot:
+    def __init__(self, name=None):
+        self.offsets, self.width = field_offsets(SNAPSHOT_FIELDS)
+        self.input_offsets, self.input_width = field_offsets(INPUT_FIELDS)
+        size = 8 * (CONTROL_SIZE + INPUT_ROWS * self.input_width + 2 * self.width)
+        # name is None to make a new block, or the name of a block made by another process to use it
+        self.owner = name is None
+        self.memory = shared_memory.SharedMemory(name=name, create=self.owner, size=size)
+        buffer = self.memory.buf
+        self.control = np.ndarray(CONTROL_SIZE, dtype=np.int64, buffer=buffer)
+        self.inputs = np.ndarray((INPUT_ROWS, self.input_width), dtype=np.float64, buffer=buffer, offset=8 * CONTROL_SIZE)
+        self.slots = np.ndarray((2, self.width), dtype=np.float64, buffer=buffer,
+                                offset=8 * (CONTROL_SIZE + INPUT_ROWS * self.input_width))
+        if self.owner:
+            self.control[:] = 0
+            self.inputs[:] = 0
+            self.slots[:] = 0
+
+    @property
+    def name(self):
+        return self.memory.name
+
+    # function to get a field out of a row of snapshot values
+    def field(self, values, name):
+        start, end = self.offsets[name]
+        return values[start:end]
+
+    # function to get an input field of the row for a step (step numbers start at 1)
+    def input_field(self, tick, name):
+        start, end = self.input_offsets[name]
+        return self.inputs[tick % INPUT_ROWS, start:end]
+
+    # function to write a step into the slot that isn't published, and then publish it
+    def publish(self, tick, values):
+        slot = 1 - int(self.control[PUBLISHED])
+        self.control[SLOT_SEQUENCE + slot] += 1  # odd, being written
+        self.slots[slot] = values
+        self.control[SLOT_TICK + slot] = tick
+        self.control[SLOT_SEQUENCE + slot] += 1  # even, finished
+        self.control[PUBLISHED] = slot
+
+    # function to copy the latest published step into out (a float64 array of width values), returns its step number
+    def read(self, out):
+        while True:
+            slot = int(self.control[PUBLISHED])
+            sequence = int(self.control[SLOT_SEQUENCE + slot])
+            if sequence % 2 == 0:
+                out[:] = self.slots[slot]
+                tick = int(self.control[SLOT_TICK + slot])
+                if int(self.control[SLOT_SEQUENCE + slot]) == sequence:
+                    return tick
+            # the worker was writing the slot, try the newly published one
+
+    # function to stop using the block, the process that made it also frees it
+    def close(self):
+        # the numpy views have to go before the memory can be closed
+        self.control = self.inputs = self.slots = None
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
+
+
+# function run by the worker process
+# steps the simulation until it has run as many steps as the game asked for, publishing each step, then waits
+def run_simulation(name, wake):
+    snapshot = SharedSnapshot(name)
+    values = np.zeros(snapshot.width)
+    tick = snapshot.read(values)
+    position = snapshot.field(values, "position")
+    previous_position = snapshot.field(values, "previous_position")
+    angle = snapshot.field(values, "angle")
+    previous_angle = snapshot.field(values, "previous_angle")
+    control = snapshot.control
+    while control[RUNNING]:
+        if tick >= control[TARGET]:
+            # nothing to do until the game asks for more steps
+            wake.wait(0.05)
+            wake.clear()
+            continue
+        tick += 1
+        # the same movement as Player.update and Orbiter.update, with the inputs the game gave for this step
+        previous_position[:] = position
+        position += snapshot.input_field(tick, "velocity")
+        previous_angle[:] = angle
+        angle += snapshot.input_field(tick, "orbiter_speed")
+        snapshot.publish(tick, values)
+    snapshot.close()
+
+
+# Define the simulation process class
+# runs the player's and the orbiter's movement in a worker process. each GameWorld.update asks the worker for one
+# more step and copies the latest step the worker has finished into the player and orbiter, so the game can draw
+# while the worker computes the next step. the game is drawn up to one step behind the steps it has asked for.
+# each step's inputs are kept until the worker runs it, so the worker ends up exactly where update() would have
+class SimulationProcess:
+    def __init__(self, player, orbiter=None):
+        self.snapshot = SharedSnapshot()
+        self.values = np.zeros(self.snapshot.width)  # latest step read from the worker
+        self.tick = 0  # step number of the latest step read
+        snapshot = self.snapshot
+        # start from where the player and orbiter are now
+        snapshot.field(self.values, "position")[:] = player.position
+        snapshot.field(self.values, "previous_position")[:] = player.previous_position
+        if orbiter is not None:
+            snapshot.field(self.values, "angle")[:] = orbiter.angle
+            snapshot.field(self.values, "previous_angle")[:] = orbiter.previous_angle
+        snapshot.publish(0, self.values)
+        snapshot.control[RUNNING] = 1
+        self.wake = multiprocessing.Event()
+        self.process = multiprocessing.Process(target=run_simulation, args=(snapshot.name, self.wake), daemon=True)
+        self.process.start()
+
+    # number of steps asked for that the worker hasn't finished yet
+    @property
+    def lag(self):
+        return int(self.snapshot.control[TARGET]) - self.tick
+
+    # function to ask the worker for one more step, using the player's velocity and the orbiter's speed at the time
+    def request_step(self, player, orbiter=None):
+        snapshot = self.snapshot
+        tick = int(snapshot.control[TARGET]) + 1
+        if self.lag >= INPUT_ROWS - 1:
+            # the input ring is full, wait for the worker to catch up instead of writing over steps it hasn't run
+            self.wait()
+        snapshot.input_field(tick, "velocity")[:] = player.velocity
+        snapshot.input_field(tick, "orbiter_speed")[0] = orbiter.speed if orbiter is not None else 0.0
+        snapshot.control[TARGET] = tick
+        self.wake.set()
+
+    # function to copy the latest finished step into the player and orbiter
+    def sync(self, player, orbiter=None):
+        snapshot = self.snapshot
+        self.tick = snapshot.read(self.values)
+        player.position[:] = snapshot.field(self.values, "position")
+        player.previous_position[:] = snapshot.field(self.values, "previous_position")
+        if orbiter is not None:
+            orbiter.angle = float(snapshot.field(self.values, "angle")[0])
+            orbiter.previous_angle = float(snapshot.field(self.values, "previous_angle")[0])
+
+    # function to wait until the worker has finished every step asked for, e.g. before saving
+    def wait(self, timeout=1.0):
+        end = time.perf_counter() + timeout
+        self.tick = self.snapshot.read(self.values)
+        while self.tick < self.snapshot.control[TARGET] and time.perf_counter() < end:
+            time.sleep(0.0005)
+            self.tick = self.snapshot.read(self.values)
+
+    # function to stop the worker and free the shared memory
+    def stop(self):
+        if self.snapshot.control is None:
+            return
+        self.snapshot.control[RUNNING] = 0
+        self.wake.set()
+        self.process.join(timeout=2)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.snapshot.close()
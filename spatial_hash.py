@@ -0,0 +1,214 @@
+'''
+10/18/2026
+spatial_hash.py
+Uniform grid spatial index, used by the game world for culling and area queries
+'''
+
+import math
+import numpy as np
+
+
+# function to work out the square cells (cell_size pixels) that many rectangles overlap, all at once with numpy
+# xs and ys are the top left corners (map coords) and widths and heights the sizes (arrays, or single values)
+# returns the first and last cell of each rectangle as arrays (x0, y0, x1, y1), an array of rectangle numbers
+# sorted by cell, and a list of ((cell_x, cell_y), start, end) for every cell that something overlaps,
+# where numbers[start:end] are the rectangles in that cell
+# rectangles are numbered from first in the order they were given, and each cell lists them in that order
+def cell_groups(cell_size, xs, ys, widths=0, heights=0, first=0):
+    xs = np.asarray(xs, dtype=np.float64)
+    ys = np.asarray(ys, dtype=np.float64)
+    count = len(xs)
+    x0 = np.floor(xs / cell_size).astype(np.int64)
+    y0 = np.floor(ys / cell_size).astype(np.int64)
+    x1 = np.floor((xs + widths) / cell_size).astype(np.int64)
+    y1 = np.floor((ys + heights) / cell_size).astype(np.int64)
+
+    # give every cell a single number (counting down the columns from the top left cell used),
+    # then list every (cell, rectangle) pair as one number: cell number * count + rectangle number
+    # small rectangles usually only overlap one cell
+    left = int(x0.min())
+    top = int(y0.min())
+    column_height = int(y1.max()) - top + 1
+    cell_numbers = (x0 - left) * column_height + (y0 - top)
+    numbers = np.arange(count)
+    pairs = []
+    for offset_x in range(int((x1 - x0).max()) + 1):
+        for offset_y in range(int((y1 - y0).max()) + 1):
+            overlaps = (x0 + offset_x <= x1) & (y0 + offset_y <= y1)
+            pairs.append((cell_numbers[overlaps] + (offset_x * column_height + offset_y)) * count + numbers[overlaps])
+    # sorting the pair numbers sorts by cell, keeping the rectangles in each cell in the order they were given
+    pairs = np.sort(np.concatenate(pairs))
+    pair_cells, numbers = np.divmod(pairs, count)
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(pair_cells)) + 1))
+    ends = np.append(starts[1:], len(pairs))
+    keys_x, keys_y = np.divmod(pair_cells[starts], column_height)
+    groups = list(zip(zip((keys_x + left).tolist(), (keys_y + top).tolist()), starts.tolist(), ends.tolist()))
+    return (x0, y0, x1, y1), numbers + first, groups
+
+
+# Define the insert batch class
+# the objects added by one call to SpatialHash.insert_many, kept as arrays until they are needed
+class InsertBatch:
+    def __init__(self, objects, first, ranges, numbers):
+        self.objects = objects  # list of the objects, in the order they were given
+        self.first = first  # insertion number of the first object, the rest follow on from it
+        self.ranges = ranges  # (x0, y0, x1, y1) arrays, the first and last cell of each object
+        self.numbers = numbers  # object numbers sorted by cell, see cell_groups
+
+    # function to get the objects in one cell (a slice of numbers) as a dict of object -> insertion number
+    def cell(self, start, end):
+        objects = self.objects
+        first = self.first
+        return {objects[number]: first + number for number in self.numbers[start:end].tolist()}
+
+    # function to get the object entries, in the same form as SpatialHash.entries
+    def entries(self):
+        x0, y0, x1, y1 = self.ranges
+        orders = range(self.first, self.first + len(self.objects))
+        return zip(self.objects, zip(x0.tolist(), y0.tolist(), x1.tolist(), y1.tolist(), orders))
+
+
+# Define the spatial hash class
+# The map is split into square cells of cell_size pixels. Every object is stored in each cell
+# that its bounding box overlaps, so a query only has to look at the cells under the query rectangle
+class SpatialHash:
+    def __init__(self, cell_size=200):
+        self.cell_size = cell_size  # pixels, width and height of each cell
+        # (cell_x, cell_y) -> dict of object -> insertion number for the objects in the cell
+        # the insertion number is used to return objects in draw order
+        self.cells = {}
+        # object -> (first cell x, first cell y, last cell x, last cell y, insertion number)
+        # use the objects property, objects added with insert_many are only put in here when it is used
+        self.entries = {}
+        # objects added with insert_many are only put in a cell when the cell is first looked at
+        # (cell_x, cell_y) -> list of (batch, start, end) still to be added to the cell
+        self.pending_cells = {}
+        self.pending_batches = []  # batches still to be added to entries
+        self.counter = 0  # next insertion number
+
+    # every object in the index -> its entry (see entries)
+    @property
+    def objects(self):
+        if self.pending_batches:
+            for batch in self.pending_batches:
+                self.entries.update(batch.entries())
+            self.pending_batches = []
+        return self.entries
+
+    # function to get the range of cells that a rectangle overlaps
+    def cell_range(self, x, y, width=0, height=0):
+        x0 = math.floor(x / self.cell_size)
+        y0 = math.floor(y / self.cell_size)
+        x1 = math.floor((x + width) / self.cell_size)
+        y1 = math.floor((y + height) / self.cell_size)
+        return x0, y0, x1, y1
+
+    # function to get a cell, adding any objects still waiting to go in it (None if the cell is empty)
+    def get_cell(self, key):
+        cell = self.cells.get(key)
+        slices = self.pending_cells.pop(key, None)
+        if slices is not None:
+            if cell is None:
+                cell = self.cells[key] = {}
+            for batch, start, end in slices:
+                cell.update(batch.cell(start, end))
+        return cell
+
+    # function to add an object with its bounding box (top left corner, width and height, map coords)
+    def insert(self, obj, x, y, width=0, height=0):
+        # if the object is already in the index, move it instead
+        if obj in self.objects:
+            self.remove(obj)
+        x0, y0, x1, y1 = self.cell_range(x, y, width, height)
+        for cell_x in range(x0, x1 + 1):
+            for cell_y in range(y0, y1 + 1):
+                key = (cell_x, cell_y)
+                cell = self.get_cell(key)
+                if cell is None:
+                    cell = self.cells[key] = {}
+                cell[obj] = self.counter
+        self.entries[obj] = (x0, y0, x1, y1, self.counter)
+        self.counter += 1
+
+    # function to add many objects at once, xs, ys, widths and heights are arrays (or single values for the sizes)
+    # the cells are worked out for every object with numpy, and the objects are kept in arrays until
+    # a cell they are in is looked at (or an object is looked up), so adding them is much faster than calling insert
+    def insert_many(self, objects, xs, ys, widths=0, heights=0):
+        objects = list(objects)
+        entries = self.objects
+        for obj in objects:
+            if obj in entries:
+                self.remove(obj)
+        count = len(objects)
+        if count == 0:
+            return
+        ranges, numbers, groups = cell_groups(self.cell_size, xs, ys, widths, heights)
+        batch = InsertBatch(objects, self.counter, ranges, numbers)
+        self.counter += count
+        self.pending_batches.append(batch)
+        pending_cells = self.pending_cells
+        for key, start, end in groups:
+            slices = pending_cells.get(key)
+            if slices is None:
+                pending_cells[key] = [(batch, start, end)]
+            else:
+                slices.append((batch, start, end))
+
+    # function to remove an object from the index (does nothing if it is not in the index)
+    def remove(self, obj):
+        entry = self.objects.pop(obj, None)
+        if entry is None:
+            return
+        x0, y0, x1, y1, _ = entry
+        for cell_x in range(x0, x1 + 1):
+            for cell_y in range(y0, y1 + 1):
+                key = (cell_x, cell_y)
+                cell = self.get_cell(key)
+                del cell[obj]
+                # drop empty cells so the dict only holds cells that have something in them
+                if not cell:
+                    del self.cells[key]
+
+    # function to update the bounding box of an object that has moved
+    # the object is treated as newly added, so it will be drawn on top
+    def move(self, obj, x, y, width=0, height=0):
+        self.insert(obj, x, y, width, height)
+
+    # function to sort objects into the order they were added, found is a dict of object -> insertion number
+    def in_order(self, found):
+        return sorted(found, key=found.__getitem__)
+
+    # function to get all objects in cells overlapping the given rectangle (map coords)
+    # objects are returned in the order they were added, so they can be drawn in that order
+    # this is a broad phase check, objects near the edge of the rectangle may not actually overlap it
+    def query(self, x, y, width, height):
+        x0, y0, x1, y1 = self.cell_range(x, y, width, height)
+        found = {}
+        cells = self.cells
+        # loop over whichever is smaller: the cells under the rectangle or the occupied cells
+        if (x1 - x0 + 1) * (y1 - y0 + 1) <= len(cells) + len(self.pending_cells):
+            for cell_x in range(x0, x1 + 1):
+                for cell_y in range(y0, y1 + 1):
+                    cell = self.get_cell((cell_x, cell_y))
+                    if cell:
+                        found.update(cell)
+        else:
+            for key in [key for key in self.pending_cells if x0 <= key[0] <= x1 and y0 <= key[1] <= y1]:
+                self.get_cell(key)
+            for (cell_x, cell_y), cell in cells.items():
+                if x0 <= cell_x <= x1 and y0 <= cell_y <= y1:
+                    found.update(cell)
+        return self.in_order(found)
+
+    # function to get all objects stored in the cell containing a point (map coords)
+    def query_point(self, x, y):
+        cell = self.get_cell((math.floor(x / self.cell_size), math.floor(y / self.cell_size)))
+        if not cell:
+            return []
+        return self.in_order(cell)
+
+    def __contains__(self, obj):
+        return obj in self.objects
+
+    def __len__(self):
+        return len(self.entries) + sum(len(batch.objects) for batch in self.pending_batches)
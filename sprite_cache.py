@@ -0,0 +1,76 @@
+'''
+10/18/2026
+sprite_cache.py
+Shared cache of scaled surfaces, so images are not rescaled every frame
+'''
+
+from collections import OrderedDict
+import pygame
+
+
+# Define the scaled surface cache class
+# scaled copies are keyed by the source surface and the target size
+# the least recently used copies are dropped once the cache goes over its memory cap
+class ScaledSurfaceCache:
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        self.max_bytes = max_bytes  # memory cap for all cached surfaces (bytes)
+        self.entries = OrderedDict()  # (id(source), width, height) -> (source, scaled surface, size in bytes)
+        self.total_bytes = 0  # bytes used by the cached surfaces
+        self.hits = 0  # number of lookups answered from the cache
+        self.misses = 0  # number of lookups that had to rescale
+        self.evictions = 0  # number of surfaces dropped to stay under the memory cap
+
+    # function to get a scaled copy of a surface, size is (width, height)
+    def get(self, source, size):
+        width, height = int(size[0]), int(size[1])
+        # the source is kept in the entry so its id can't be reused while the entry exists
+        key = (id(source), width, height)
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return entry[1]
+
+        self.misses += 1
+        scaled = pygame.transform.scale(source, (width, height))
+        num_bytes = scaled.get_pitch() * scaled.get_height()
+        self.entries[key] = (source, scaled, num_bytes)
+        self.total_bytes += num_bytes
+        # evict the least recently used surfaces, but always keep the one that was just made
+        while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+            _, (_, _, old_bytes) = self.entries.popitem(last=False)
+            self.total_bytes -= old_bytes
+            self.evictions += 1
+        return scaled
+
+    # function to drop every scaled copy of a source surface
+    # needed if the source surface is drawn on after it was cached
+    def invalidate(self, source):
+        for key in [key for key, entry in self.entries.items() if entry[0] is source]:
+            self.total_bytes -= self.entries.pop(key)[2]
+
+    # function to empty the cache
+    def clear(self):
+        self.entries.clear()
+        self.total_bytes = 0
+
+    # function to get the cache counters, for printing
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": len(self.entries),
+            "bytes": self.total_bytes,
+        }
+
+
+# the cache shared by items and entities
+scaled_cache = ScaledSurfaceCache()
+
+
+# function to get a scaled copy of a surface from the shared cache
+def get_scaled(source, size):
+    return scaled_cache.get(source, size)
@@ -0,0 +1,56 @@
+'''
+10/18/2026
+timestep.py
+Fixed timestep clock, so the game simulation runs at the same speed no matter how fast frames are rendered
+'''
+
+import time
+
+
+# Define the fixed timestep class
+# real time is added to an accumulator every frame, and the simulation is stepped once for every
+# full step of time in the accumulator. the time left over is used to interpolate between the last
+# two simulation steps when drawing
+class FixedTimestep:
+    def __init__(self, step_rate=80, max_steps=5, max_skipped_renders=2):
+        self.step = 1 / step_rate  # seconds per simulation step
+        self.max_steps = max_steps  # most steps to run for one frame, past this the extra time is dropped
+        self.max_skipped_renders = max_skipped_renders  # most frames in a row to skip rendering when falling behind
+        self.accumulator = 0.0  # seconds of real time not simulated yet
+        self.last_time = None  # time of the last call to advance
+        self.skipped_renders = 0  # number of frames in a row that rendering was skipped
+        self.behind = False  # True if the last advance couldn't run all the steps that were due
+        self.total_steps = 0  # number of steps run since the start
+
+    # function to add the real time since the last call, returns the number of simulation steps to run
+    # now can be passed in to drive the clock with a different time source (e.g. replays)
+    def advance(self, now=None):
+        if now is None:
+            now = time.perf_counter()
+        if self.last_time is None:
+            self.last_time = now
+        self.accumulator += now - self.last_time
+        self.last_time = now
+
+        steps = int(self.accumulator / self.step)
+        self.behind = steps > self.max_steps
+        if self.behind:
+            # too far behind to catch up, drop the extra time so the game slows down instead of freezing
+            steps = self.max_steps
+            self.accumulator = self.max_steps * self.step
+        self.accumulator -= steps * self.step
+        self.total_steps += steps
+        return steps
+
+    # function to check if this frame should be rendered
+    # under load, rendering is skipped for a few frames so the simulation can keep up
+    def should_render(self):
+        if self.behind and self.skipped_renders < self.max_skipped_renders:
+            self.skipped_renders += 1
+            return False
+        self.skipped_renders = 0
+        return True
+
+    # how far between the last step and the next step the current time is (0 to 1), used for interpolation
+    def alpha(self):
+        return min(self.accumulator / self.step, 1.0)
@@ -0,0 +1,114 @@
+'''
+10/18/2026
+vector_bench.py
+Microbenchmark of the per object screen/map position math
+Times each function against a copy of how it was written before (with small numpy arrays made on every call)
+and prints the nanoseconds per call of both as JSON.
+
+example:
+    python vector_bench.py --calls 200000
+'''
+
+import timeit
+import argparse
+
+# importing benchmark sets up the dummy drivers, it has to come before anything that imports pygame
+from benchmark import write_results
+
+import numpy as np
+import pygame
+
+from main import Player, GameStats, GameWorld
+from Items import create_rand_item
+from Inventories import ObjectInventory
+
+
+# the functions as they were before, kept here to compare against
+
+def old_get_camera_position(world):
+    return world.player.view_position - world.screen_size / 2
+
+
+def old_check_if_on_screen(world, position, object_width=0, object_height=0):
+    position = position + np.array([object_width, object_height]) / 2
+    view_position = world.player.view_position
+    if view_position[0] - world.screen_size[0] / 2 < position[0] < view_position[0] + world.screen_size[0] / 2:
+        if view_position[1] - world.screen_size[1] / 2 < position[1] < view_position[1] + world.screen_size[1] / 2:
+            return True
+    return False
+
+
+def old_screen_to_map(world, screen_position):
+    return screen_position + old_get_camera_position(world)
+
+
+def old_item_get_screen_pos(item, player_position):
+    screen_size = np.array(pygame.display.get_surface().get_size())
+    cam_pos = player_position - screen_size / 2
+    return item.map_position - cam_pos
+
+
+def old_inventory_get_screen_pos(inventory):
+    camera_position = inventory.player.view_position - inventory.screen_size / 2
+    return inventory.map_position - camera_position
+
+
+def old_player_interpolate(player, alpha):
+    if alpha >= 1:
+        player.view_position = player.position
+    else:
+        player.view_position = player.previous_position + (player.position - player.previous_position) * alpha
+
+
+# function to time a function, returns nanoseconds per call
+def time_call(function, calls):
+    # best of 3, so a hiccup in one run doesn't count
+    return min(timeit.repeat(function, number=calls, repeat=3)) / calls * 1e9
+
+
+def run(args):
+    pygame.init()
+    screen_size = np.array([800, 800])
+    pygame.display.set_mode(screen_size)
+
+    player = Player(screen_size / 2, np.array([3.0, 1.0]), 5.0, 10, (190, 25, 190), None)
+    player.update()
+    world = GameWorld(GameStats(screen_size, np.array([2000, 2000])), player, [], [], None, [], [])
+    item = create_rand_item(False, np.array([350.0, 420.0]))
+    inventory = ObjectInventory(screen_size, np.empty((1, 1), dtype=object), True, np.array([100.0, 100.0]), player)
+    screen_position = np.array([123.0, 456.0])
+    # the old interpolate replaces view_position, so it gets its own player
+    old_player = Player(screen_size / 2, np.array([3.0, 1.0]), 5.0, 10, (190, 25, 190), None)
+    old_player.update()
+
+    # name -> (before, after)
+    cases = {
+        "get_camera_position": (lambda: old_get_camera_position(world), world.camera_xy),
+        "check_if_on_screen": (lambda: old_check_if_on_screen(world, item.map_position, 100, 100),
+                               lambda: world.check_if_on_screen(item.map_position, 100, 100)),
+        "screen_to_map": (lambda: old_screen_to_map(world, screen_position), lambda: world.screen_to_map(screen_position)),
+        "Item.get_screen_pos": (lambda: old_item_get_screen_pos(item, player.view_position),
+                                lambda: item.get_screen_pos(player.view_position)),
+        "ObjectInventory.get_screen_pos": (lambda: old_inventory_get_screen_pos(inventory), inventory.get_screen_pos),
+        "Player.interpolate": (lambda: old_player_interpolate(old_player, 0.5), lambda: player.interpolate(0.5)),
+    }
+
+    results = {"calls": args.calls, "ns_per_call": {}}
+    for name, (before, after) in cases.items():
+        before_ns = time_call(before, args.calls)
+        after_ns = time_call(after, args.calls)
+        results["ns_per_call"][name] = {"before": before_ns, "after": after_ns, "speedup": before_ns / after_ns}
+    return results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Microbenchmark of the per object screen/map position math")
+    parser.add_argument("--calls", type=int, default=100000, help="number of calls to time for each function")
+    parser.add_argument("--output", help="file to write the JSON results to (default: print them)")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    results = run(args)
+    write_results(results, args.output)
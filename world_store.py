@@ -0,0 +1,268 @@
+'''
+10/18/2026
+world_store.py
+Turning barriers, items and entities into plain numpy arrays (and back), and storing them on disk
+Items are stored as their ItemType's type_id, and entity images as the path they were loaded from,
+so nothing has to be pickled
+'''
+
+import os
+import json
+import shutil
+import tempfile
+import numpy as np
+
+from Items import Item, item_types
+from Inventories import ObjectInventory
+from entity_objects import EntityWithInventory, CraftingEntity
+from assets import assets
+
+
+# entity classes that can be stored, class name -> class
+entity_classes = {
+    "EntityWithInventory": EntityWithInventory,
+    "CraftingEntity": CraftingEntity,
+}
+
+
+# function to get the arrays for some barriers in a barrier field, indices is an array of barrier indices
+def encode_barriers(field, indices):
+    return {
+        "barrier_positions": field.positions[indices],
+        "barrier_sizes": field.sizes[indices],
+        "barrier_shapes": field.shapes[indices],
+        "barrier_colors": field.colors[indices],
+    }
+
+
+# function to get the arrays for some items on the map (type ids and map positions)
+def encode_items(items):
+    type_ids = np.array([item.kind.type_id for item in items], dtype=np.int32)
+    positions = np.array([(item.map_x, item.map_y) for item in items], dtype=np.float64).reshape(-1, 2)
+    return {"item_types": type_ids, "item_positions": positions}
+
+
+# function to make the items on the map from arrays made by encode_items, registry is the ItemTypeRegistry the ids are from
+# the positions are turned into python floats all at once, like spawn_items
+def decode_items(data, registry=item_types):
+    positions = np.asarray(data["item_positions"], dtype=np.float64).tolist()
+    kinds = registry.types
+    return [Item(kinds[type_id], False, position, (0, 0), False)
+            for type_id, position in zip(data["item_types"].tolist(), positions)]
+
+
+# function to get the type ids of an inventory's contents as an array the same shape as the contents, -1 for empty slots
+def encode_inventory(inventory):
+    type_ids = np.full(inventory.contents.shape, -1, dtype=np.int32)
+    for item, (x, y) in inventory.item_slots.items():
+        type_ids[x, y] = item.kind.type_id
+    return type_ids
+
+
+# function to fill an inventory from an array made by encode_inventory, returns the new items
+def decode_inventory(type_ids, inventory, registry=item_types):
+    items = []
+    for x, y in zip(*np.nonzero(type_ids >= 0)):
+        x, y = int(x), int(y)
+        item = Item(registry[int(type_ids[x, y])], True, inventory.map_position, (0, 0), False)
+        inventory.set_slot(x, y, item)
+        items.append(item)
+    return items
+
+
+# function to get the arrays for some entities and their inventories
+# inventory contents are flattened one after the other into inventory_contents,
+# and inventory_shapes has the slot shape of each entity's inventory to split them up again
+# entity images are saved as their asset paths, so an entity whose image wasn't loaded through assets can't be saved
+def encode_entities(entities):
+    count = len(entities)
+    image_paths = []
+    for entity in entities:
+        path = assets.path_of(entity.image)
+        if not path:
+            raise ValueError("can't save {} at {}: its image wasn't loaded through the asset manager".format(
+                type(entity).__name__, [float(value) for value in entity.position]))
+        image_paths.append(path)
+    data = {
+        "entity_classes": np.array([type(entity).__name__ for entity in entities], dtype=str).reshape(count),
+        "entity_images": np.array(image_paths, dtype=str).reshape(count),
+        "entity_positions": np.array([entity.position for entity in entities], dtype=np.float64).reshape(count, 2),
+        "inventory_positions": np.zeros((count, 2), dtype=np.float64),
+        "inventory_shapes": np.zeros((count, 2), dtype=np.int32),
+        "inventory_open": np.zeros(count, dtype=bool),
+    }
+    contents = [np.zeros(0, dtype=np.int32)]
+    for index, entity in enumerate(entities):
+        inventory = entity.inventory
+        data["inventory_positions"][index] = inventory.map_position
+        data["inventory_shapes"][index] = inventory.contents.shape
+        data["inventory_open"][index] = inventory.is_open
+        contents.append(encode_inventory(inventory).ravel())
+    data["inventory_contents"] = np.concatenate(contents)
+    return data
+
+
+# function to make entities (with their inventories and the items in them) from arrays made by encode_entities
+# returns the list of entities and the list of items that are in their inventories
+def decode_entities(data, screen_size, player, registry=item_types):
+    entities = []
+    items = []
+    offset = 0
+    for index, class_name in enumerate(data["entity_classes"].tolist()):
+        x_slots, y_slots = data["inventory_shapes"][index].tolist()
+        type_ids = data["inventory_contents"][offset:offset + x_slots * y_slots].reshape(x_slots, y_slots)
+        offset += x_slots * y_slots
+        position = np.array(data["entity_positions"][index], dtype=np.float64)
+        inventory_position = np.array(data["inventory_positions"][index], dtype=np.float64)
+        # the inventory usually sits at the entity's position, keep them sharing the same array like when they are made
+        if np.array_equal(inventory_position, position):
+            inventory_position = position
+        contents = np.empty((x_slots, y_slots), dtype=object)
+        inventory = ObjectInventory(screen_size, contents, bool(data["inventory_open"][index]), inventory_position, player)
+        items.extend(decode_inventory(type_ids, inventory, registry))
+        image = assets.load(str(data["entity_images"][index]))
+        entities.append(entity_classes[class_name](image, position, inventory))
+    return entities, items
+
+
+# Define the chunk store class
+# keeps the arrays for each chunk of the map in its own .npz file in a folder,
+# if no folder is given a temporary one is made and deleted by close()
+class ChunkStore:
+    def __init__(self, directory=None):
+        self.temporary = directory is None  # True if the folder should be deleted when the store is closed
+        if directory is None:
+            directory = tempfile.mkdtemp(prefix="world_chunks_")
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.saves = 0  # number of chunks written
+        self.loads = 0  # number of chunks read
+
+    # function to get the file a chunk is stored in
+    def path(self, key):
+        return os.path.join(self.directory, "chunk_{}_{}.npz".format(key[0], key[1]))
+
+    def __contains__(self, key):
+        return os.path.exists(self.path(key))
+
+    # function to write a chunk's arrays (name -> numpy array), replacing what was stored before
+    def save(self, key, arrays):
+        np.savez(self.path(key), **arrays)
+        self.saves += 1
+
+    # function to read a chunk's arrays, None if the chunk was never stored
+    def load(self, key):
+        path = self.path(key)
+        if not os.path.exists(path):
+            return None
+        with np.load(path, allow_pickle=False) as file:
+            arrays = {name: file[name] for name in file.files}
+        self.loads += 1
+        return arrays
+
+    # function to get the keys of every stored chunk
+    def keys(self):
+        keys = []
+        for file_name in os.listdir(self.directory):
+            if file_name.startswith("chunk_") and file_name.endswith(".npz"):
+                chunk_x, chunk_y = file_name[len("chunk_"):-len(".npz")].split("_")
+                keys.append((int(chunk_x), int(chunk_y)))
+        return sorted(keys)
+
+    # function to forget a stored chunk
+    def discard(self, key):
+        path = self.path(key)
+        if os.path.exists(path):
+            os.remove(path)
+
+    # function to delete the folder if it is a temporary one
+    def close(self):
+        if self.temporary and os.path.isdir(self.directory):
+            shutil.rmtree(self.directory)
+
+
+# version of the save folder layout, increase this when the layout changes
+SAVE_VERSION = 1
+
+# arrays in a save, each is stored in its own .npy file so it can be memory-mapped when loading
+SAVE_ARRAYS = [
+    "barrier_positions", "barrier_sizes", "barrier_shapes", "barrier_colors",
+    "item_types", "item_positions",
+    "entity_classes", "entity_images", "entity_positions",
+    "inventory_positions", "inventory_shapes", "inventory_open", "inventory_contents",
+    "player_inventory",
+]
+
+
+# function to put the arrays of the chunks in the same order into one set of arrays
+# (barriers, items and entities from each chunk are concatenated one after the other)
+def join_arrays(chunks):
+    return {name: np.concatenate([chunk[name] for chunk in chunks]) for name in chunks[0]}
+
+
+# function to save a game world to a folder
+# the folder has a header.json (player, item type table, format version) and one .npy file per array,
+# the item type table turns the type ids in the arrays back into item types when loading in another session
+# if the world is streaming, the chunks that are only on disk are saved too
+def save_world(world, directory, registry=item_types):
+    os.makedirs(directory, exist_ok=True)
+    field = world.barriers
+    # barriers loaded from a save can still be memory-mapped from its files, which are about to be written over
+    for name in ("positions", "sizes", "shapes", "colors"):
+        array = getattr(field, name)
+        if isinstance(array, np.memmap):
+            setattr(field, name, np.array(array))
+    chunks = [encode_barriers(field, np.arange(field.count))]
+    chunks[0].update(encode_items(list(world.item_grid.objects)))
+    chunks[0].update(encode_entities(world.entities))
+    streamer = world.streamer
+    if streamer is not None:
+        for key in streamer.store.keys():
+            if key not in streamer.loaded:
+                chunks.append(streamer.store.load(key))
+    arrays = join_arrays(chunks)
+    arrays["player_inventory"] = encode_inventory(world.player_inventory)
+
+    player = world.player
+    item_in_hand = player.item_in_hand
+    header = {
+        "version": SAVE_VERSION,
+        "item_types": [[kind.name, kind.description, kind.item_rarity, kind.item_type, kind.type_name, kind.value,
+                        kind.image_path] for kind in registry.types],
+        "player": {
+            "position": [float(value) for value in player.position],
+            "velocity": [float(value) for value in player.velocity],
+            "max_velocity": player.max_velocity,
+            "size": player.size,
+            "color": list(player.color),
+            "item_in_hand": -1 if item_in_hand is None else item_in_hand.kind.type_id,
+        },
+        "player_inventory_open": world.player_inventory.is_open,
+    }
+    for name in SAVE_ARRAYS:
+        np.save(os.path.join(directory, name + ".npy"), arrays[name], allow_pickle=False)
+    # write the header last, so a folder with a header always has all of its arrays
+    with open(os.path.join(directory, "header.json"), "w") as file:
+        json.dump(header, file)
+
+
+# function to read a save folder made by save_world, returns (header, arrays)
+# with mmap the arrays are memory-mapped copy-on-write, so only the parts that are used are read from disk
+# and they can still be changed in memory (without changing the save)
+# the item type ids in the arrays are changed to the ids of the same item types in registry
+def load_world(directory, registry=item_types, mmap=True):
+    with open(os.path.join(directory, "header.json")) as file:
+        header = json.load(file)
+    if header["version"] != SAVE_VERSION:
+        raise ValueError("unsupported save version: " + str(header["version"]))
+    mmap_mode = "c" if mmap else None
+    arrays = {name: np.load(os.path.join(directory, name + ".npy"), mmap_mode=mmap_mode, allow_pickle=False)
+              for name in SAVE_ARRAYS}
+
+    # saved type id -> type id in this session, -1 (empty slot) stays -1
+    type_ids = np.array([registry.get(*fields).type_id for fields in header["item_types"]] + [-1], dtype=np.int32)
+    for name in ("item_types", "inventory_contents", "player_inventory"):
+        arrays[name] = type_ids[arrays[name]]
+    hand = header["player"]["item_in_hand"]
+    header["player"]["item_in_hand"] = int(type_ids[hand])
+    return header, arrays
@@ -0,0 +1,130 @@
+'''
+10/18/2026
+world_streaming.py
+Loads the parts of the map near the player and puts the rest away on disk
+'''
+
+import math
+import numpy as np
+
+from world_store import ChunkStore, encode_barriers, encode_items, decode_items, encode_entities, decode_entities
+
+
+# Define the world streamer class
+# the map is split into square chunks. chunks within load_radius chunks of the player are kept in the game world,
+# chunks further than load_radius + 1 away are evicted: their barriers, map items and entities are written to the
+# chunk store and removed from the world, and they are read back in when the player comes near again.
+# (the extra chunk before evicting stops chunks being saved and loaded over and over when walking along an edge)
+# everything belongs to the chunk its position is in, even if it sticks out into the next chunk
+class WorldStreamer:
+    def __init__(self, world, store=None, chunk_size=1024, load_radius=2):
+        self.world = world  # GameWorld to load chunks into
+        self.store = store if store is not None else ChunkStore()  # where evicted chunks are kept
+        self.chunk_size = chunk_size  # pixels, width and height of each chunk
+        self.load_radius = load_radius  # chunks, how far from the player's chunk to keep chunks loaded
+        self.center = None  # chunk the player was in on the last update
+        # chunks that are in the world, everything already in the world starts out loaded
+        self.loaded = self.chunks_with_objects()
+
+    # function to get the chunk a map position is in
+    def chunk_of(self, position):
+        return math.floor(position[0] / self.chunk_size), math.floor(position[1] / self.chunk_size)
+
+    # function to get the chunk each row of an (n, 2) array of map positions is in, as two arrays
+    def chunks_of(self, positions):
+        chunks = np.floor(np.asarray(positions, dtype=np.float64).reshape(-1, 2) / self.chunk_size).astype(np.int64)
+        return chunks[:, 0], chunks[:, 1]
+
+    # function to get the set of chunks that have something in them in the world
+    def chunks_with_objects(self):
+        world = self.world
+        chunks = set()
+        chunk_x, chunk_y = self.chunks_of(world.barriers.positions[:world.barriers.count])
+        chunks.update(zip(chunk_x.tolist(), chunk_y.tolist()))
+        for item in world.item_grid.objects:
+            chunks.add(self.chunk_of(item.map_position))
+        for entity in world.entities:
+            chunks.add(self.chunk_of(entity.position))
+        return chunks
+
+    # function to load and evict chunks around the player, call once per update
+    # only does any work when the player moves into a different chunk
+    def update(self):
+        center = self.chunk_of(self.world.player.position)
+        if center == self.center:
+            return
+        self.center = center
+        center_x, center_y = center
+        # evict chunks that are too far away first, so the world is as small as possible when new chunks are added
+        self.evict([key for key in sorted(self.loaded)
+                    if max(abs(key[0] - center_x), abs(key[1] - center_y)) > self.load_radius + 1])
+        for chunk_x in range(center_x - self.load_radius, center_x + self.load_radius + 1):
+            for chunk_y in range(center_y - self.load_radius, center_y + self.load_radius + 1):
+                if (chunk_x, chunk_y) not in self.loaded:
+                    self.load((chunk_x, chunk_y))
+
+    # function to write chunks to the store and remove everything in them from the world
+    # all the chunks are removed from the world at once, so evicting many chunks costs about the same as evicting one
+    def evict(self, keys):
+        if not keys:
+            return
+        world = self.world
+        # barriers whose position is in one of the chunks, grouped by chunk
+        chunk_x, chunk_y = self.chunks_of(world.barriers.positions[:world.barriers.count])
+        barrier_indices = {}
+        if len(chunk_x):
+            evicting = set(keys)
+            # find the different chunks the barriers are in once, instead of checking every barrier for every chunk
+            barrier_chunks, chunk_index = np.unique(np.stack((chunk_x, chunk_y), axis=1), axis=0, return_inverse=True)
+            chunk_index = chunk_index.ravel()
+            order = np.argsort(chunk_index, kind="stable")
+            group_starts = np.searchsorted(chunk_index[order], np.arange(len(barrier_chunks) + 1))
+            for number, (key_x, key_y) in enumerate(barrier_chunks.tolist()):
+                if (key_x, key_y) in evicting:
+                    barrier_indices[(key_x, key_y)] = order[group_starts[number]:group_starts[number + 1]]
+        barrier_mask = np.zeros(world.barriers.count, dtype=bool)
+
+        evicted_items = []
+        evicted_entities = []
+        for key in keys:
+            x, y = key[0] * self.chunk_size, key[1] * self.chunk_size
+            indices = barrier_indices.get(key, np.zeros(0, dtype=np.intp))
+            # items on the map and entities whose position is in the chunk
+            # (anything in the chunk is in the spatial index cells under the chunk, the cells also have things sticking in from outside)
+            items = [item for item in world.item_grid.query(x, y, self.chunk_size, self.chunk_size)
+                     if self.chunk_of(item.map_position) == key]
+            entities = [entity for entity in world.entity_grid.query(x, y, self.chunk_size, self.chunk_size)
+                        if self.chunk_of(entity.position) == key]
+            if len(indices) or items or entities:
+                arrays = encode_barriers(world.barriers, indices)
+                arrays.update(encode_items(items))
+                arrays.update(encode_entities(entities))
+                self.store.save(key, arrays)
+                barrier_mask[indices] = True
+                evicted_items.extend(items)
+                evicted_entities.extend(entities)
+            else:
+                self.store.discard(key)
+            self.loaded.discard(key)
+
+        world.remove_barriers(barrier_mask)
+        world.remove_items(evicted_items)
+        world.remove_entities(evicted_entities)
+
+    # function to read a chunk back from the store into the world, chunks that were never stored are left empty
+    def load(self, key):
+        self.loaded.add(key)
+        arrays = self.store.load(key)
+        if arrays is None:
+            return
+        world = self.world
+        world.add_barriers(arrays["barrier_positions"], arrays["barrier_sizes"], arrays["barrier_shapes"], arrays["barrier_colors"])
+        world.add_items(decode_items(arrays), arrays["item_positions"])
+        entities, inventory_items = decode_entities(arrays, world.screen_size, world.player)
+        for entity in entities:
+            world.add_entity(entity)
+        world.add_items(inventory_items)
+
+    # function to put every loaded chunk in the store, e.g. before closing the game
+    def evict_all(self):
+        self.evict(sorted(self.loaded))